@@ -1,20 +1,26 @@
 # app.py
 
+import io
 import os
-import requests, io
-import base64
 import streamlit as st
 import pandas as pd
 import folium
 import numpy as np
 import matplotlib.pyplot as plt
-from dateutil.easter import easter
-from PIL import Image
-from folium.plugins import MarkerCluster, TimestampedGeoJson
-from folium import CustomIcon
+from branca.colormap import LinearColormap
+from folium.plugins import FastMarkerCluster, TimestampedGeoJson
 from streamlit_folium import st_folium
 from sklearn.metrics import mean_squared_error, mean_absolute_error, r2_score
 
+import anomalies
+import assets
+import datasets
+import hexgrid
+import metrics
+import profiles
+import rebalancing
+import stations
+
 # ─── GLOBAL CSS ──────────────────────────────────────────────
 st.markdown("""
 <style>
@@ -46,19 +52,20 @@ def navigate(page_name):
 
 # ─── 3. TOP NAVIGATION ──────────────────────────────────────
 st.markdown("<h1 style='text-align:center;'>🚲 Bicing Barcelona</h1>", unsafe_allow_html=True)
+# on_click cambia de página antes del rerun: un solo rerun por clic
 c1, c2, c3, c4, c5, c6 = st.columns(6)
 with c1:
-    if st.button("🏠 Home"): navigate("Home")
+    st.button("🏠 Home", on_click=navigate, args=("Home",))
 with c2:
-    if st.button("🏁 Kaggle Submission"): navigate("Prediction")
+    st.button("🏁 Kaggle Submission", on_click=navigate, args=("Prediction",))
 with c3:
-    if st.button("🗺️ Maps"): navigate("Maps")
+    st.button("🗺️ Maps", on_click=navigate, args=("Maps",))
 with c4:
-    if st.button("📊 Stats"): navigate("Stats")
+    st.button("📊 Stats", on_click=navigate, args=("Stats",))
 with c5:
-    if st.button("🏆 Ranking"): navigate("Ranking")
+    st.button("🏆 Ranking", on_click=navigate, args=("Ranking",))
 with c6:
-    if st.button("👥 Team"): navigate("Team")
+    st.button("👥 Team", on_click=navigate, args=("Team",))
 st.markdown("---")
 
 # ─── 4. HOME PAGE ───────────────────────────────────────────
@@ -94,10 +101,10 @@ if st.session_state.page == "Home":
     st.write("")
     logo_fp = os.path.join(os.path.dirname(__file__), "assets", "UB logo.png")
     if os.path.exists(logo_fp):
-        data = base64.b64encode(open(logo_fp, "rb").read()).decode("utf-8")
+        data = assets.data_url("assets/UB logo.png", width=200)  # 2x del tamaño mostrado
         st.markdown(f"""
           <div style="text-align:center; margin-top:20px;">
-            <img src="data:image/png;base64,{data}" width="100" />
+            <img src="{data}" width="100" />
             <p style="color:#5f6368; margin-top:8px;">Universitat de Barcelona</p>
           </div>
         """, unsafe_allow_html=True)
@@ -108,13 +115,8 @@ if st.session_state.page == "Home":
 elif st.session_state.page == "Prediction":
     st.header("🏁 Kaggle Submission")
 
-    # 1) Cargo el CSV de tu submission ya subido al repo (o desde URL)
-    @st.cache_data
-    def load_submission(path="data/submission_local.csv"):
-        df = pd.read_csv(path)
-        return df
-
-    submission = load_submission()
+    # 1) Cargo el CSV de tu submission ya subido al repo (compartido entre sesiones)
+    submission = datasets.submission().view()
 
     # 2) Muestro las primeras filas
     st.subheader("📋 Preview")
@@ -133,339 +135,493 @@ elif st.session_state.page == "Prediction":
     st.pyplot(fig)
 
     # 5) (Opcional) Métricas si tienes un ground_truth.csv
-    gt_file = st.file_uploader("Upload ground_truth.csv to evaluate metrics", type="csv")
-    if gt_file:
-        truth = pd.read_csv(gt_file)
-        df_eval = submission.merge(truth, on="Id", how="inner")  # ajusta el nombre de la columna clave
-        y_true = df_eval["True"]
-        y_pred = df_eval["Predicted"]
-
-        st.subheader("🧮 Evaluation metrics")
-        mse = mean_squared_error(y_true, y_pred)
-        mae = mean_absolute_error(y_true, y_pred)
-        r2  = r2_score(y_true, y_pred)
-        st.metric("MSE", f"{mse:.2f}")
-        st.metric("MAE", f"{mae:.2f}")
-        st.metric("R²",  f"{r2:.2f}")
-
-        # Curva real vs predicha
-        st.subheader("🔍 Real vs. Forecast")
-        fig2, ax2 = plt.subplots(figsize=(5, 3))
-        ax2.scatter(y_true, y_pred, alpha=0.6)
-        ax2.plot([y_true.min(), y_true.max()],[y_true.min(), y_true.max()], 'r--')
-        ax2.set_xlabel("Real value")
-        ax2.set_ylabel("Forecast value")
-        st.pyplot(fig2)
+    # Subir el fichero sólo re-ejecuta la evaluación, no la página entera
+    @st.fragment
+    def evaluation(submission):
+        gt_file = st.file_uploader("Upload ground_truth.csv to evaluate metrics", type="csv")
+        if gt_file:
+            truth = pd.read_csv(gt_file)
+            df_eval = submission.merge(truth, on="Id", how="inner")  # ajusta el nombre de la columna clave
+            y_true = df_eval["True"]
+            y_pred = df_eval["Predicted"]
+
+            st.subheader("🧮 Evaluation metrics")
+            mse = mean_squared_error(y_true, y_pred)
+            mae = mean_absolute_error(y_true, y_pred)
+            r2  = r2_score(y_true, y_pred)
+            st.metric("MSE", f"{mse:.2f}")
+            st.metric("MAE", f"{mae:.2f}")
+            st.metric("R²",  f"{r2:.2f}")
+
+            # Curva real vs predicha
+            st.subheader("🔍 Real vs. Forecast")
+            fig2, ax2 = plt.subplots(figsize=(5, 3))
+            ax2.scatter(y_true, y_pred, alpha=0.6)
+            ax2.plot([y_true.min(), y_true.max()],[y_true.min(), y_true.max()], 'r--')
+            ax2.set_xlabel("Real value")
+            ax2.set_ylabel("Forecast value")
+            st.pyplot(fig2)
+
+    evaluation(submission)
 
 # ─── 5. MAP ───────────────────────────────────────────────────
 elif st.session_state.page == "Maps":
     st.header("🗺️ Bicing Stations - Current & Proposals")
 
-    @st.cache_data
-    def load_markers(path="data/markers_combinado.csv") -> pd.DataFrame:
-        df = pd.read_csv(path, encoding="latin1", sep=",")
-        df.columns = ["name","latitude","longitude","description","type"]
-        df["type"] = df["type"].astype(str).str.strip().str.lower()
-        df = df.dropna(subset=["latitude","longitude"])
-        df["latitude"]  = pd.to_numeric(df["latitude"], errors="coerce")
-        df["longitude"] = pd.to_numeric(df["longitude"], errors="coerce")
-        return df.dropna(subset=["latitude","longitude"]).reset_index(drop=True)
-
-    markers_df = load_markers()
+    markers_df = datasets.markers().view()
     if markers_df.empty:
         st.error("No data found in data/markers_combinado.csv")
         st.stop()
+    rejected = datasets.markers().rejected
+    if not rejected.empty:
+        st.caption(f"{rejected['row'].nunique()} rows of data/markers_combinado.csv skipped (bad or missing coordinates).")
 
-    # columnas: mapa | filtro
-    map_col, filter_col = st.columns([3, 1], gap="medium")
-
-    # filtro
-    with filter_col:
-        st.markdown("#### Filter stations by type")
-        types = ["new", "old"]
-        selected = st.multiselect(
-            "Station Type",
-            options=types,
-            default=types,
-            format_func=lambda t: "🟢 Proposal" if t == "new" else "🔴 Current"
-        )
-        filtered = markers_df[markers_df["type"].isin(selected)]
-        if filtered.empty:
-            st.error("No stations match this filter.")
-
-    # mapa
-    with map_col:
-        df = filtered if not filtered.empty else markers_df
-        # prepare icons
-        BASE = os.path.dirname(__file__)
-        def make_data_url(fn, mime):
-            b64 = base64.b64encode(open(os.path.join(BASE, fn), "rb").read()).decode("utf-8")
-            return f"data:{mime};base64,{b64}"
-
-        url_red   = make_data_url("bicing-logo-red.svg", "image/svg+xml")
-        url_green = make_data_url("bicing-logo-green.png", "image/png")
-        icon_red   = CustomIcon(icon_image=url_red,   icon_size=(20,20), icon_anchor=(10,20))
-        icon_green = CustomIcon(icon_image=url_green, icon_size=(20,20), icon_anchor=(10,20))
-
-        m = folium.Map(location=[41.3851,2.1734], zoom_start=13)
-        cluster = MarkerCluster(disableClusteringAtZoom=14, maxClusterRadius=30).add_to(m)
-
-        for _, r in df.iterrows():
-            ico = icon_green if r["type"] == "new" else icon_red
-        
-            # Definís el contenido del popup en una variable aparte
-            popup_html = f"""
-                <div style='font-family: sans-serif; font-size: 13px;'>
-                    <b>{r['name']}</b><br>
-                    <span style='color: #555;'>{r['description']}</span>
-                </div>
+    # Perfiles de uso: matriz estación × hora por versión del dataset, clusters por k
+    @st.cache_data
+    def profile_matrix(fingerprint, by_daytype):
+        return profiles.matrix(datasets.release().view(), datasets.station_master().view(), by_daytype)
+
+    @st.cache_data
+    def station_profiles(fingerprint, k, by_daytype):
+        return profiles.cluster(profile_matrix(fingerprint, by_daytype), k)
+
+    # Filtro y mapa en un fragment: cambiar el filtro sólo re-ejecuta esta sección
+    @st.fragment
+    def station_map(markers_df):
+        # columnas: mapa | filtro
+        map_col, filter_col = st.columns([3, 1], gap="medium")
+
+        # filtro
+        with filter_col:
+            st.markdown("#### Filter stations by type")
+            types = ["new", "old"]
+            selected = st.multiselect(
+                "Station Type",
+                options=types,
+                default=types,
+                format_func=lambda t: "🟢 Proposal" if t == "new" else "🔴 Current"
+            )
+            filtered = markers_df[markers_df["type"].isin(selected)]
+            if filtered.empty:
+                st.error("No stations match this filter.")
+
+            # Color de las estaciones actuales según su día típico (clusters)
+            color_by = st.radio("Color current stations by", ["Type", "Usage profile"], horizontal=True)
+            colors = None
+            if color_by == "Usage profile":
+                k = st.slider("Profiles", 2, 8, profiles.N_CLUSTERS)
+                by_daytype = st.checkbox("Workdays and weekends/holidays apart")
+                assigned, centers = station_profiles(datasets.release().fingerprint, k, by_daytype)
+                colors = assigned["color"]
+                counts = assigned["archetype"].value_counts()
+                st.markdown("<br>".join(
+                    f"<span style='color:{c}'>●</span> {a} ({counts.get(a, 0)})"
+                    for a, c in zip(centers.index, profiles.COLORS)
+                ), unsafe_allow_html=True)
+
+        # mapa
+        with map_col:
+            df = filtered if not filtered.empty else markers_df
+            # iconos codificados una vez por proceso (PNG reducido a 2x del icono)
+            url_red   = assets.data_url("bicing-logo-red.svg")
+            url_green = assets.data_url("bicing-logo-green.png", width=40)
+
+            # Capacidad desde la tabla de estaciones (join por station_id)
+            cap = ("<br>Capacity: " + df["capacity"].astype("Int64").astype("string") + " docks").fillna("")
+
+            # Propuestas sin datos: siempre con icono; estaciones sin perfil, en gris
+            color = pd.Series(None, index=df.index, dtype=object)
+            profile = ""
+            if colors is not None:
+                current = df["type"] != "new"
+                color[current] = df.loc[current, "station_id"].map(colors).fillna("#9aa0a6").astype(object)
+                profile = ("<br>Profile: " + df["station_id"].map(assigned["archetype"])).fillna("")
+
+            popups = (
+                "<div style='font-family: sans-serif; font-size: 13px;'><b>" + df["name"].astype(str)
+                + "</b><br><span style='color: #555;'>" + df["description"].astype(str) + "</span>"
+                + cap + profile + "</div>"
+            )
+            data = list(zip(
+                df["latitude"].tolist(), df["longitude"].tolist(),
+                popups.tolist(), (df["type"] == "new").tolist(), color.tolist()
+            ))
+
+            # Una sola capa JS con todos los puntos: folium no genera una plantilla por marcador
+            callback = f"""
+                function (row) {{
+                    if (row[4]) {{
+                        return L.circleMarker(new L.LatLng(row[0], row[1]), {{
+                            radius: 6, weight: 1, color: "#ffffff",
+                            fillColor: row[4], fillOpacity: 0.9
+                        }}).bindPopup(row[2], {{maxWidth: 250}});
+                    }}
+                    var icon = L.icon({{
+                        iconUrl: row[3] ? "{url_green}" : "{url_red}",
+                        iconSize: [20, 20], iconAnchor: [10, 20]
+                    }});
+                    return L.marker(new L.LatLng(row[0], row[1]), {{icon: icon}})
+                        .bindPopup(row[2], {{maxWidth: 250}});
+                }}
             """
-        
-            # Y usás esa variable en el marcador
-            folium.Marker(
-                location=[r["latitude"], r["longitude"]],
-                popup=folium.Popup(popup_html, max_width=250),
-                icon=ico
-            ).add_to(cluster)
-        
-        # Mostrás el mapa
-        st_folium(m, width=800, height=400)
-
-    # 4.2 Animated Map: Availability Over Time
+            m = folium.Map(location=stations.CITY_CENTER, zoom_start=13)
+            FastMarkerCluster(
+                data, callback=callback,
+                options={"disableClusteringAtZoom": 14, "maxClusterRadius": 30},
+            ).add_to(m)
+
+            # Sin returned_objects, mover o hacer zoom en el mapa no provoca reruns
+            st_folium(m, width=800, height=400, returned_objects=[])
+
+            if colors is not None:
+                with st.expander("Usage profiles: fill share vs. daily mean, by hour"):
+                    st.line_chart(profiles.daily(centers.T), color=profiles.COLORS[:len(centers)])
+
+    station_map(markers_df)
+
+    # 4.1 Rebalancing planner: rutas de furgonetas sobre estaciones vacías/llenas
+    st.header("🚐 Rebalancing planner")
+
+    @st.cache_resource
+    def station_distances(fingerprint):
+        master = datasets.station_master().view()
+        return rebalancing.distance_matrix(master["latitude"], master["longitude"])
+
+    @st.cache_data
+    def rebalance_plan(fingerprint, hour, vans, van_capacity, target, max_km):
+        state = rebalancing.station_state(
+            datasets.release().view(), datasets.station_master().view(), hour
+        )
+        return rebalancing.plan(
+            state, station_distances(fingerprint),
+            n_vehicles=vans, van_capacity=van_capacity, target=target, max_km=max_km
+        )
+
+    # El formulario sólo re-ejecuta el planificador al pulsar "Plan routes"
+    @st.fragment
+    def rebalancing_planner():
+        plan_col, ctrl_col = st.columns([3, 1], gap="medium")
+        with ctrl_col:
+            with st.form("rebalancing"):
+                source = st.radio("Bikes per station", ["Latest reading", "Typical at hour"])
+                hour = st.slider("Hour", 0, 23, 8)
+                vans = st.number_input("Vans", 1, 10, 3)
+                van_capacity = st.number_input("Bikes per van", 5, 60, 20)
+                target = st.slider("Target fill", 0.2, 0.8, 0.5, 0.05)
+                max_km = st.slider("Max km per van", 5, 80, 30)
+                st.form_submit_button("Plan routes")
+
+        release_ds = datasets.release()
+        master = datasets.station_master().view()
+        plan = rebalance_plan(
+            release_ds.fingerprint, hour if source == "Typical at hour" else None,
+            int(vans), int(van_capacity), float(target), float(max_km)
+        )
+
+        with plan_col:
+            if plan.empty:
+                st.info("No station needs rebalancing with these settings.")
+            else:
+                stops = plan.join(master[["name", "latitude", "longitude"]], on="station_id")
+                k1, k2, k3 = st.columns(3)
+                k1.metric("Bikes moved", int(stops.loc[stops["bikes"] > 0, "bikes"].sum()))
+                k2.metric("Stations served", stops["station_id"].nunique())
+                k3.metric("Total km", f"{stops.groupby('vehicle')['km'].max().sum():.1f}")
+
+                colors = profiles.COLORS
+                rm = folium.Map(location=rebalancing.DEPOT, zoom_start=13)
+                folium.Marker(rebalancing.DEPOT, tooltip="Depot", icon=folium.Icon(icon="home")).add_to(rm)
+                for v, route in stops.groupby("vehicle"):
+                    color = colors[(v - 1) % len(colors)]
+                    path = [rebalancing.DEPOT] + route[["latitude", "longitude"]].values.tolist()
+                    folium.PolyLine(path, color=color, weight=3, opacity=0.8, tooltip=f"Van {v}").add_to(rm)
+                    for r in route.itertuples():
+                        action = f"pick up {r.bikes}" if r.bikes > 0 else f"drop off {-r.bikes}"
+                        folium.CircleMarker(
+                            [r.latitude, r.longitude], radius=5, color=color,
+                            fill=True, fill_color="#d93025" if r.bikes > 0 else "#188038", fill_opacity=0.9,
+                            tooltip=f"Van {v} · stop {r.seq}: {action} · {r.name}",
+                        ).add_to(rm)
+                st_folium(rm, width=800, height=450, returned_objects=[])
+
+                with st.expander("Route sheet"):
+                    st.dataframe(
+                        stops[["vehicle", "seq", "station_id", "name", "bikes", "load", "km"]]
+                        .rename(columns={"name": "Station", "bikes": "Bikes (+pick/−drop)"}),
+                        hide_index=True,
+                    )
+
+    rebalancing_planner()
+
+    # 4.2 Disponibilidad por zonas: hexágonos a zoom bajo, estaciones a zoom alto
+    st.header("⬢ Availability by area")
+
+    @st.cache_data
+    def area_layers(fingerprint):
+        # Agregados por (estación, hora) y por (celda, hora) de cada tamaño, una vez por dataset
+        master = datasets.station_master().view()
+        hourly = metrics.hourly(datasets.release().view())
+        grid = hexgrid.assign(master)
+        return hourly, {size: hexgrid.aggregate(hourly, master, grid, size) for size in hexgrid.SIZES}
+
+    fill_colors = LinearColormap(["#d93025", "#f9ab00", "#188038"], vmin=0, vmax=1)
+    fill_colors.caption = "Fill (available bikes / docks)"
+
+    def fill_style(feature):
+        fill = feature["properties"]["fill"]
+        return {
+            "fillColor": "#9aa0a6" if fill is None else fill_colors(fill),
+            "color": "#ffffff", "weight": 1, "fillOpacity": 0.65,
+        }
+
+    # El mapa base no se recarga: sólo cambia la capa al mover el zoom o la hora
+    @st.fragment
+    def area_map():
+        hour = st.slider("Hour of day", 0, 23, 8, key="area_hour")
+        hourly, by_cell = area_layers(datasets.release().fingerprint)
+        master = datasets.station_master().view()
+
+        # Zoom y encuadre de la última interacción con el mapa
+        view = st.session_state.get("area_map") or {}
+        zoom = view.get("zoom") or 12
+        bounds = view.get("bounds") or {}
+        size = hexgrid.level(zoom)
+
+        def in_view(lat, lon, pad=0.0):
+            if not bounds.get("_southWest"):
+                return np.ones(len(lat), dtype=bool)
+            sw, ne = bounds["_southWest"], bounds["_northEast"]
+            return ((lat >= sw["lat"] - pad) & (lat <= ne["lat"] + pad)
+                    & (lon >= sw["lng"] - pad) & (lon <= ne["lng"] + pad))
+
+        layer = folium.FeatureGroup(name="availability")
+        if size:
+            cells = by_cell[size].xs(hour, level="hour")
+            lat, lon = hexgrid.centers(cells.index, size)
+            cells = cells.loc[in_view(lat, lon, pad=size / 111_000)].round({"bikes": 0, "fill": 2, "turnover": 2})
+            folium.GeoJson(
+                hexgrid.geojson(cells, size), style_function=fill_style,
+                tooltip=folium.GeoJsonTooltip(
+                    ["stations", "bikes", "fill", "turnover"],
+                    aliases=["Stations", "Bikes", "Fill", "Turnover"],
+                ),
+            ).add_to(layer)
+        else:
+            at_hour = hourly.xs(hour, level="hour").join(master[["name", "latitude", "longitude", "capacity"]])
+            at_hour = at_hour.loc[in_view(at_hour["latitude"], at_hour["longitude"])]
+            cap = at_hour["capacity"].astype("Float64")
+            at_hour["fill"] = (at_hour["available_bikes"] / cap.where(cap > 0)).clip(0, 1).round(2)
+            points = {
+                "type": "FeatureCollection",
+                "features": [
+                    {"type": "Feature",
+                     "geometry": {"type": "Point", "coordinates": [float(r.longitude), float(r.latitude)]},
+                     "properties": {"name": str(r.name), "bikes": round(float(r.available_bikes)),
+                                    "fill": None if pd.isna(r.fill) else float(r.fill)}}
+                    for r in at_hour.itertuples()
+                ],
+            }
+            folium.GeoJson(
+                points, marker=folium.CircleMarker(radius=7), style_function=fill_style,
+                tooltip=folium.GeoJsonTooltip(["name", "bikes", "fill"], aliases=["Station", "Bikes", "Fill"]),
+            ).add_to(layer)
+
+        m = folium.Map(location=stations.CITY_CENTER, zoom_start=12)
+        fill_colors.add_to(m)
+        st_folium(
+            m, key="area_map", feature_group_to_add=layer,
+            returned_objects=["zoom", "bounds"], width=800, height=450,
+        )
+        st.caption(
+            f"Typical availability at {hour}:00 — "
+            + (f"{size} m hexagons; zoom in for smaller cells and single stations."
+               if size else "single stations; zoom out for areas.")
+        )
+
+    area_map()
+
+    # 4.3 Animated Map: Availability Over Time
     st.header("🚲👨🏻‍👩🏻‍👧🏻‍🧒🏻 Comparison of Bike Availability and Population")
     
-    # 1. Carga las imágenes desde disco
-    am_img         = Image.open("data/AM.jpg")          # mañana
-    pm_img         = Image.open("data/PM.jpg")          # tarde
-    population_img = Image.open("data/Population.jpg")  # población
-    
-    # 2. Muestra en tres columnas
+    # Imágenes en WebP al ancho mostrado, cargadas sólo al hacer scroll
     col1, col2 = st.columns(2)
     
     with col1:
         st.subheader("Morning Availability")
-        st.image(am_img, use_container_width=True, caption="Availability at 8 AM")
+        assets.image("data/AM.jpg", caption="Availability at 8 AM", sizes="50vw")
     
     with col2:
         st.subheader("Afternoon Availability")
-        st.image(pm_img, use_container_width=True, caption="Availability at 6 PM")
+        assets.image("data/PM.jpg", caption="Availability at 6 PM", sizes="50vw")
     
     st.subheader("Population Density")
-    st.image(population_img, use_container_width=True, caption="Population per census tract")
+    assets.image("data/Population.jpg", caption="Population per census tract")
 
 
 # ─── 6. STATS ───────────────────────────────────────────────
 elif st.session_state.page == "Stats":
     st.header("📊 Bicing usage patterns")
 
-    import requests, io
-    from PIL import Image
-    import matplotlib.pyplot as plt
+    # 1) Dataset compartido (season, hour, holiday ya calculados una vez)
+    df = datasets.release().view()
 
-    # 1) Carga remota del CSV con parseo de 'time'
     @st.cache_data
-    def load_data():
-        url = (
-            "https://github.com/valosada/APP_Capstone_2025"
-            "/releases/download/v1.0/bicing_interactive_dataset.csv"
-        )
-        resp = requests.get(url)
-        resp.raise_for_status()
-        text = resp.content.decode("utf-8-sig")
-        df = pd.read_csv(io.StringIO(text), parse_dates=["time"])
-        return df.dropna(subset=["latitude","longitude","available_bikes"])
+    def stats_metrics(fingerprint):
+        df = datasets.release().view()
+        return {
+            "season":   metrics.season_profile(df),
+            "holiday":  metrics.holiday_profile(df),
+            "holidays": metrics.holidays_by_hour(df),
+        }
+
+    def png(fig):
+        # Mismos ajustes que st.pyplot; la figura se cierra para no acumularla en pyplot
+        buf = io.BytesIO()
+        fig.savefig(buf, format="png", bbox_inches="tight", dpi=200)
+        plt.close(fig)
+        return buf.getvalue()
 
-    df = load_data()
+    @st.cache_data
+    def stats_charts(fingerprint):
+        # Gráficos dibujados una vez por versión del dataset; los reruns sólo envían el PNG
+        m = stats_metrics(fingerprint)
+        charts = {}
+
+        # Media de available_bikes por (season, hour), un gráfico por estación
+        hourly_season = m["season"]
+        for season in ["Winter", "Spring", "Summer", "Autumn"]:
+            df_s = hourly_season[hourly_season["season"] == season]
+            if df_s.empty:
+                continue
+            fig, ax = plt.subplots()
+            ax.plot(df_s["hour"], df_s["avg_bikes"], marker="o")
+            ax.set_xlabel("Hour of Day")
+            ax.set_ylabel("Available Bikes (avg)")
+            ax.set_xticks(range(0,24,2))
+            ax.set_title(season)
+            ax.grid(alpha=0.3)
+            charts[season] = png(fig)
+
+        # Línea comparativa Workday vs Holidays
+        fig0, ax0 = plt.subplots(figsize=(8,3))
+        m["holiday"].plot(ax=ax0)
+        ax0.set_title("Avg available bikes by hour\nWorkday vs Holidays/August")
+        ax0.set_xlabel("Hour of Day")
+        ax0.set_ylabel("Avg available bikes")
+        ax0.legend(["Workday","Holiday/August"])
+        ax0.grid(alpha=0.3)
+        charts["holiday"] = png(fig0)
+
+        # Small multiples por cada festivo
+        by_holiday = m["holidays"]
+        unique_hols = by_holiday.columns.tolist()
+        n = len(unique_hols)
+        if n:
+            cols = 2
+            rows = (n + cols - 1)//cols
+            fig, axs = plt.subplots(rows, cols, figsize=(8,4*rows), sharex=True, sharey=True)
+            for ax, hol in zip(axs.ravel(), unique_hols):
+                hourly = by_holiday[hol].dropna()
+                ax.plot(hourly.index, hourly.values, marker='o')
+                ax.set_title(hol)
+                ax.set_xticks(range(0,24,4))
+                ax.grid(alpha=0.3)
+            # Apaga ejes sobrantes
+            for ax in axs.ravel()[len(unique_hols):]:
+                ax.axis('off')
+            fig.suptitle("Hourly availability on each holiday", y=0.92)
+            charts["holidays"] = png(fig)
+        return charts
 
     # ─── 2) No filtering by station, use full dataset
-    sub = df.copy()
-    if sub.empty:
+    if df.empty:
         st.warning("No data available.")
         st.stop()
 
     # ─── 3) Imágenes de Disponibilidad vs Población ───────────────
-    try:
-        lines_img   = Image.open("data/Dock available altitude hour.jpg")
-        heatmap_img = Image.open("data/Heatmep main change in availability per altitude and hour.jpg")
-    except FileNotFoundError as e:
-        st.error(f"No pude encontrar la imagen: {e.filename}")
-        st.stop()
+    lines_img   = "data/Dock available altitude hour.jpg"
+    heatmap_img = "data/Heatmep main change in availability per altitude and hour.jpg"
+    for img in (lines_img, heatmap_img):
+        if not os.path.exists(os.path.join(os.path.dirname(__file__), img)):
+            st.error(f"No pude encontrar la imagen: {img}")
+            st.stop()
 
     st.subheader("Dock availability per altitude and hours")
-    st.image(lines_img, use_container_width=True)
+    assets.image(lines_img)
     st.markdown("---")
 
     st.subheader("Heatmap: Availability (%) per altitude and hours")
-    st.image(heatmap_img, use_container_width=True)
+    assets.image(heatmap_img)
     st.markdown("---")
 
     # ─── 4) Comparación por estación climática ─────────────────────
     st.subheader("🌦️ Average availability by hour & seasons")
+    charts = stats_charts(datasets.release().fingerprint)
 
-    # Función mes → estación climática
-    def month_to_season(m):
-        if m in (12, 1, 2):
-            return "Winter"
-        elif m in (3, 4, 5):
-            return "Spring"
-        elif m in (6, 7, 8):
-            return "Summer"
-        else:
-            return "Autumn"
-
-    data_season = sub.copy()
-    data_season["season"] = data_season["time"].dt.month.apply(month_to_season)
-
-    # Media de available_bikes por (season, hour)
-    hourly_season = (
-        data_season
-        .groupby([
-            "season",
-            data_season["time"].dt.hour.rename("hour")
-        ])["available_bikes"]
-        .mean()
-        .reset_index(name="avg_bikes")
-    )
-
-    # Dibujar 4 mini‑gráficos (2×2) para cada estación climática
+    # 4 mini‑gráficos (2×2) para cada estación climática
     seasons = ["Winter", "Spring", "Summer", "Autumn"]
     cols = st.columns(2)
     for i, season in enumerate(seasons):
-        df_s = hourly_season[hourly_season["season"] == season]
         with cols[i % 2]:
-            if df_s.empty:
+            if season not in charts:
                 st.warning(f"No hay datos para {season}")
             else:
                 st.markdown(f"**{season}**")
-                fig, ax = plt.subplots()
-                ax.plot(df_s["hour"], df_s["avg_bikes"], marker="o")
-                ax.set_xlabel("Hour of Day")
-                ax.set_ylabel("Available Bikes (avg)")
-                ax.set_xticks(range(0,24,2))
-                ax.set_title(season)
-                ax.grid(alpha=0.3)
-                st.pyplot(fig)
+                st.image(charts[season], width="stretch")
               
     st.markdown("---")
 
     # ─── 4) Comparación por festivos ─────────────────────
     st.subheader("Holidays")
 
-    # 1) Carga remota del CSV con parseo de 'time'
-    @st.cache_data
-    def load_data():
-        url = (
-            "https://github.com/valosada/APP_Capstone_2025"
-            "/releases/download/v1.0/bicing_interactive_dataset.csv"
-        )
-        resp = requests.get(url); resp.raise_for_status()
-        text = resp.content.decode("utf-8-sig")
-        df = pd.read_csv(io.StringIO(text), parse_dates=["time"])
-        return df.dropna(subset=["latitude","longitude","available_bikes"])
-
-    df = load_data()
-
-    # 2) Extraer date y hour
-    df['date'] = df['time'].dt.date
-    df['hour'] = df['time'].dt.hour
-
-    # 3) Definir festivos fijos
-    fixed = {
-        "New Year":   (1, 1),
-        "Sant Jordi": (4,23),
-        "Sant Joan":  (6,24),
-        "La Mercè":   (9,24),
-        "Christmas":  (12,25),
-    }
-    years = sorted(df['date'].apply(lambda d: d.year).unique())
-    hols = []
-    for name,(m,d) in fixed.items():
-        for y in years:
-            hols.append({
-                'date': pd.to_datetime(f"{y}-{m:02d}-{d:02d}").date(),
-                'holiday': name
-            })
-    # Pascua
-    for y in years:
-        hols.append({'date': easter(y), 'holiday': "Easter"})
-    hols_df = pd.DataFrame(hols).drop_duplicates('date')
-
-    # 4) Merge y marcar agosto
-    df = df.merge(hols_df, on='date', how='left')
-    df.loc[df['date'].apply(lambda d: d.month)==8, 'holiday'] = (
-        df['holiday'].fillna("August vacation")
-    )
-    df['is_holiday'] = df['holiday'].notna()
-
-    # 5) KPI resumen
-    work_avg = df.loc[~df.is_holiday, 'available_bikes'].mean()
-    holi_avg = df.loc[ df.is_holiday, 'available_bikes'].mean()
+    # 2-4) date, hour, holiday e is_holiday (con agosto) vienen del dataset compartido
 
     # 6) Línea comparativa Workday vs Holidays
-    cmp = df.groupby(['hour','is_holiday'])['available_bikes'].mean().unstack()
-    fig0, ax0 = plt.subplots(figsize=(8,3))
-    cmp.plot(ax=ax0)
-    ax0.set_title("Avg available bikes by hour\nWorkday vs Holidays/August")
-    ax0.set_xlabel("Hour of Day")
-    ax0.set_ylabel("Avg available bikes")
-    ax0.legend(["Workday","Holiday/August"])
-    ax0.grid(alpha=0.3)
-    st.pyplot(fig0)
+    st.image(charts["holiday"], width="stretch")
 
     st.markdown("---")
 
     # 7) Small multiples por cada festivo
-    unique_hols = df['holiday'].dropna().unique()
-    n = len(unique_hols)
-    cols = 2
-    rows = (n + cols - 1)//cols
-    fig, axs = plt.subplots(rows, cols, figsize=(8,4*rows), sharex=True, sharey=True)
-    for ax, hol in zip(axs.ravel(), unique_hols):
-        sub = df[df.holiday==hol]
-        hourly = sub.groupby('hour')['available_bikes'].mean()
-        ax.plot(hourly.index, hourly.values, marker='o')
-        ax.set_title(hol)
-        ax.set_xticks(range(0,24,4))
-        ax.grid(alpha=0.3)
-    # Apaga ejes sobrantes
-    for ax in axs.ravel()[len(unique_hols):]:
-        ax.axis('off')
-    fig.suptitle("Hourly availability on each holiday", y=0.92)
-    st.pyplot(fig)
+    if "holidays" not in charts:
+        st.info("No holidays in the dataset period.")
+    else:
+        st.image(charts["holidays"], width="stretch")
+
+    # 8) Huella de memoria del dataset compacto
+    report = datasets.release().report
+    if report is not None:
+        with st.expander("🧠 Dataset memory footprint"):
+            total = report.loc["TOTAL"]
+            st.caption(
+                f"{total['bytes_before']/1e6:.1f} MB → {total['bytes_after']/1e6:.1f} MB "
+                f"({total['ratio']}x smaller)"
+            )
+            st.dataframe(report)
+
+    # 9) Valores descartados al leer el CSV (tipos y columnas obligatorias en schemas.py)
+    rejected = datasets.release().rejected
+    if rejected is not None and not rejected.empty:
+        with st.expander(f"🧾 Values rejected while loading ({rejected['row'].nunique()} rows)"):
+            st.dataframe(rejected, hide_index=True)
 # ─── 7. RANKING ───────────────────────────────────────────────
 elif st.session_state.page == "Ranking":
     st.header("🏆 Stations")
 
+    # Métricas calculadas una vez por versión del dataset (ver metrics.py)
     @st.cache_data
-    def load_data():
-        url = (
-            "https://github.com/valosada/APP_Capstone_2025"
-            "/releases/download/v1.0/bicing_interactive_dataset.csv"
-        )
-        resp = requests.get(url); resp.raise_for_status()
-        text = resp.content.decode("utf-8-sig")
-        df = pd.read_csv(io.StringIO(text), parse_dates=["time"])
-        return df.dropna(subset=["available_bikes"])
+    def ranking_metrics(fingerprint):
+        df = datasets.release().view()
+        master = datasets.station_master().view()   # una fila por estación
+        station_turnover = metrics.turnover(df)
+        top10 = metrics.top_turnover(df, master)
+        vacias, llenas = metrics.empty_full(df, master)
+        rot_cs, sat_cs = metrics.neighborhoods(df, master, station_turnover)
+        return top10, vacias, llenas, rot_cs, sat_cs
 
-    df = load_data()
-    names = df[["station_id","name"]].drop_duplicates()
+    top10, vacias, llenas, rot_cs, sat_cs = ranking_metrics(datasets.release().fingerprint)
 
     # 1️⃣ Top-10 estaciones más usadas (variación media)
     st.subheader("1️⃣ Top-10 Movement")
-    df_sorted = (
-        df
-        .sort_values(["station_id","time"])
-        .groupby("station_id")["available_bikes"]
-        .apply(lambda s: s.diff().abs().mean())
-        .reset_index(name="mean_variation")
-    )
-    top10 = (
-        df_sorted
-        .merge(names, on="station_id")
-        .sort_values("mean_variation", ascending=False)
-        .head(10)
-        .reset_index(drop=True)
-    )
     # Trunca hacia abajo eliminando decimales
     top10["mean_variation"] = top10["mean_variation"].astype(int)
     st.table(
@@ -482,37 +638,8 @@ elif st.session_state.page == "Ranking":
     # 2️⃣ Estaciones Problema
     st.subheader("2️⃣ Top-10 usage trends")
 
-    # Vacías crónicamente (>10%)
-    vacias = (
-        df
-        .assign(is_empty=lambda d: d["available_bikes"]==0)
-        .groupby("station_id")["is_empty"]
-        .mean()
-        .reset_index(name="empty_ratio")
-        .query("empty_ratio > 0.1")
-        .merge(names, on="station_id")
-        .sort_values("empty_ratio", ascending=False)
-        .head(10)
-        .reset_index(drop=True)
-    )
-    # multiplica por 100 y trunca
+    # Vacías / llenas crónicamente (>10%): multiplica por 100 y trunca
     vacias["empty_ratio"] = (vacias["empty_ratio"]*100).astype(int).astype(str) + "%"
-
-    # Llenas crónicamente (>10%)
-    maximos = df.groupby("station_id")["available_bikes"].max().reset_index(name="max_bikes")
-    llenas = (
-        df
-        .merge(maximos, on="station_id")
-        .assign(is_full=lambda d: d["available_bikes"]==d["max_bikes"])
-        .groupby("station_id")["is_full"]
-        .mean()
-        .reset_index(name="full_ratio")
-        .query("full_ratio > 0.1")
-        .merge(names, on="station_id")
-        .sort_values("full_ratio", ascending=False)
-        .head(10)
-        .reset_index(drop=True)
-    )
     llenas["full_ratio"] = (llenas["full_ratio"]*100).astype(int).astype(str) + "%"
 
     cols = st.columns(2)
@@ -543,37 +670,31 @@ elif st.session_state.page == "Ranking":
                 })
             )
 
+    # Lecturas de sensores rotos (congelados, fuera de rango, picos): excluidas de los rankings
+    @st.cache_data
+    def sensor_anomalies(fingerprint):
+        df = datasets.release().view()
+        master = datasets.station_master().view()
+        return anomalies.intervals(df).join(master["name"], on="station_id"), int((df["anomaly"] != 0).sum()), len(df)
+
+    anom, n_flagged, n_rows = sensor_anomalies(datasets.release().fingerprint)
+    if n_flagged:
+        with st.expander(f"🛠️ Sensor anomalies excluded ({n_flagged/n_rows:.2%} of readings)"):
+            st.caption(
+                f"Frozen feeds (no change in {anomalies.STUCK_HOURS} h), more bikes than docks or below 0, "
+                "and one-reading spikes are left out of every ranking."
+            )
+            st.dataframe(
+                anom[["station_id", "name", "kind", "start", "end", "readings"]]
+                .rename(columns={"station_id": "ID", "name": "Station", "kind": "Anomaly"}),
+                hide_index=True,
+            )
+
     # ─── 8) Comparación por barrio ─────────────────────────────
     st.subheader("3️⃣ Top-10 neighborhoods")
     
-    # 1) Filtramos filas válidas
-    df_cs = df.dropna(subset=["cross_street", "available_bikes", "time", "station_id"]).copy()
-    
-    # 2) Extraemos barrio: la parte antes de la primera '/'
-    df_cs["neighborhood"] = df_cs["cross_street"].str.split("/", n=1).str[0]
-    
-    # 3) Rotación media por estación, luego promedio por barrio
-    rot = (
-        df_cs
-        .sort_values(["neighborhood","station_id","time"])
-        .groupby(["neighborhood","station_id"])["available_bikes"]
-        .apply(lambda s: s.diff().abs().mean())
-        .reset_index(name="mean_variation")
-    )
-    rot_cs = (
-        rot
-        .groupby("neighborhood")["mean_variation"]
-        .mean()
-        .sort_values(ascending=False)
-    )
-    
-    # 4) Saturación media (bicis disponibles media) por barrio
-    sat_cs = (
-        df_cs
-        .groupby("neighborhood")["available_bikes"]
-        .mean()
-        .sort_values()
-    )
+    # rot_cs (rotación media por barrio) y sat_cs (bicis disponibles media por barrio)
+    # vienen de metrics.neighborhoods
     
     # 5) Top 10 barrios por rotación
     st.markdown("**Neighborhoods by turnover (average variation)**")
@@ -618,5 +739,5 @@ elif st.session_state.page == "Team":
     cols = st.columns(4, gap="small")
     for col, member in zip(cols, team):
         with col:
-            st.image(member["img"], width=150)
+            assets.image(member["img"], width=150, alt=member["name"])
             st.markdown(f"**{member['name']}**")
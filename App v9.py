@@ -9,6 +9,9 @@ from folium.plugins import MarkerCluster
 from folium import CustomIcon
 from streamlit_folium import st_folium
 
+import schemas
+import stations
+
 # ─── AÑADE ESTO JUSTO AQUÍ ─────────────────────────────────
 st.markdown("""
 <style>
@@ -200,13 +203,10 @@ elif st.session_state.page == "Map":
     def load_markers(path="data/markers.csv") -> pd.DataFrame:
         base = os.path.dirname(__file__)
         csv_path = os.path.join(base, "data", "markers.csv")
-        df = pd.read_csv(csv_path, encoding="latin1", sep=",")
-        df.columns = ["name","latitude","longitude","description","type"]
+        # Columnas y tipos declarados en schemas.py (UTF-8, coordenadas numéricas)
+        df, _ = schemas.read("markers", csv_path)
         df["type"] = df["type"].str.strip().str.lower()
-        df = df.dropna(subset=["latitude","longitude"])
-        df["latitude"]  = pd.to_numeric(df["latitude"], errors="coerce")
-        df["longitude"] = pd.to_numeric(df["longitude"], errors="coerce")
-        return df.dropna(subset=["latitude","longitude"]).reset_index(drop=True)
+        return df
 
     markers_df = load_markers()
     # Dos columnas: mapa estático | filtro
@@ -218,7 +218,7 @@ elif st.session_state.page == "Map":
                               format_func=lambda t: "🟢 New" if t=="new" else "🔴 Old")
     filtered = markers_df[markers_df["type"].isin(sel)]
     with map_col:
-        m1 = folium.Map(location=[41.3851,2.1734], zoom_start=13)
+        m1 = folium.Map(location=stations.CITY_CENTER, zoom_start=13)
         cluster = MarkerCluster(disableClusteringAtZoom=14, maxClusterRadius=30).add_to(m1)
         # pre-carga iconos
         BASE = os.path.dirname(__file__)
@@ -245,11 +245,10 @@ elif st.session_state.page == "Map":
     @st.cache_data
     def load_availability(path="data/availability.csv") -> pd.DataFrame:
         base = os.path.dirname(__file__)
-        csv_path = os.path.join(base, "data", "availability.csv")
-        df = pd.read_csv(csv_path, parse_dates=["time"], encoding="latin1")
-        df = df.dropna(subset=["latitude","longitude","time","available_bikes"])
-        df["available_bikes"] = pd.to_numeric(df["available_bikes"], errors="coerce")
-        return df.dropna(subset=["available_bikes"]).reset_index(drop=True)
+        csv_path = os.path.join(base, schemas.SCHEMAS["availability"].path)
+        # Formato de fecha y tipos declarados en schemas.py (acepta valores como " 8")
+        df, _ = schemas.read("availability", csv_path)
+        return df
 
     avail = load_availability()
     if avail.empty:
@@ -277,7 +276,7 @@ elif st.session_state.page == "Map":
         time_geojson = {"type":"FeatureCollection","features":features}
 
         # render animated map
-        m2 = folium.Map(location=[41.3851,2.1734], zoom_start=13)
+        m2 = folium.Map(location=stations.CITY_CENTER, zoom_start=13)
         from folium.plugins import TimestampedGeoJson
         TimestampedGeoJson(
             data=time_geojson,
@@ -0,0 +1,136 @@
+# anomalies.py
+"""Broken-feed readings in the station time series.
+
+A station that reports 0 bikes for hours may really be starved; one that
+reports the same number for a whole day, more bikes than it has docks, or a
+jump that reverts at the next reading has a broken feed. ``detect`` flags those
+readings in one pass over the table sorted by (station, time):
+
+    stuck         constant-value runs (run-length encoding) lasting ``STUCK_HOURS``
+    out of range  below 0 or above the station capacity
+    spike         a reading far from both neighbours, in the same direction
+
+Everything is numpy over whole columns, with station boundaries masked out
+instead of per-station loops, so a year of 5-minute readings for every station
+takes seconds. Flags are a bitmask per reading (``0`` = clean); the metrics
+drop flagged rows through ``clean``.
+"""
+
+import numpy as np
+import pandas as pd
+
+import schemas
+import stations
+
+STUCK = 1
+OUT_OF_RANGE = 2
+SPIKE = 4
+KINDS = {STUCK: "stuck", OUT_OF_RANGE: "out of range", SPIKE: "spike"}
+
+STUCK_HOURS = 24      # not a single change in a day: the feed is frozen
+SPIKE_MIN_BIKES = 5   # a spike moves at least this many bikes…
+SPIKE_RATIO = 0.5     # …and at least this share of the station capacity
+
+
+def _order(facts: pd.DataFrame) -> np.ndarray | None:
+    """Positions that sort ``facts`` by (station_id, time); ``None`` if already sorted."""
+    sid = facts["station_id"].to_numpy()
+    t = facts["time"].to_numpy()
+    same = sid[1:] == sid[:-1]
+    if (sid[1:] >= sid[:-1]).all() and (t[1:] >= t[:-1])[same].all():
+        return None
+    return np.lexsort((t, sid))
+
+
+def _sorted(facts: pd.DataFrame, order: np.ndarray | None, column: str, dtype=None) -> np.ndarray:
+    a = facts[column].to_numpy(dtype=dtype)
+    return a if order is None else a[order]
+
+
+def detect(facts: pd.DataFrame, master: pd.DataFrame, stuck_hours: float = STUCK_HOURS) -> pd.Series:
+    """Anomaly bitmask (``STUCK | OUT_OF_RANGE | SPIKE``) per row of ``facts``.
+
+    ``facts`` needs station_id, time and available_bikes; capacities come from
+    ``stations.capacity`` (stations without one are only checked for negative
+    values).
+    """
+    n = len(facts)
+    flags = np.zeros(n, dtype="uint8")
+    if n == 0:
+        return pd.Series(flags, index=facts.index, name="anomaly")
+
+    order = _order(facts)
+    sid = _sorted(facts, order, "station_id")
+    t = schemas.timestamps(_sorted(facts, order, "time")).astype("int64")
+    x = _sorted(facts, order, "available_bikes", "float64")
+    same = sid[1:] == sid[:-1]
+    # Capacity looked up once per station, then repeated over its readings
+    first = np.flatnonzero(np.r_[True, ~same])
+    cap = stations.capacity(master, facts).reindex(sid[first]).to_numpy(dtype="float64", na_value=np.nan)
+    cap = np.repeat(cap, np.diff(np.r_[first, n]))
+
+    # Out of range (an unknown capacity is the largest reading: only negatives fail)
+    flags[(x < 0) | (x > cap)] |= OUT_OF_RANGE
+
+    # Stuck: run-length encoding of (station, value); long runs are frozen feeds
+    new_run = np.r_[True, ~same | (x[1:] != x[:-1])]
+    starts = np.flatnonzero(new_run)
+    ends = np.r_[starts[1:], n] - 1
+    stuck_run = (t[ends] - t[starts]) >= stuck_hours * 3600
+    flags[stuck_run[np.cumsum(new_run) - 1]] |= STUCK
+
+    # Spike: away from the previous and the next reading by more than the threshold
+    thr = np.fmax(SPIKE_MIN_BIKES, SPIKE_RATIO * cap[1:-1])
+    up = x[1:-1] - x[:-2]
+    down = x[1:-1] - x[2:]
+    spike = (
+        same[:-1] & same[1:]
+        & (np.sign(up) == np.sign(down))
+        & (np.abs(up) > thr) & (np.abs(down) > thr)
+    )
+    flags[1:-1][spike] |= SPIKE
+
+    if order is not None:
+        flags[order] = flags.copy()
+    return pd.Series(flags, index=facts.index, name="anomaly")
+
+
+def clean(facts: pd.DataFrame) -> pd.DataFrame:
+    """Rows without anomaly flags (all rows if ``facts`` has no ``anomaly`` column)."""
+    if "anomaly" not in facts:
+        return facts
+    bad = facts["anomaly"].to_numpy() != 0
+    return facts.loc[~bad] if bad.any() else facts
+
+
+def intervals(facts: pd.DataFrame) -> pd.DataFrame:
+    """Flagged stretches: station_id, kind, start, end, readings (longest first).
+
+    Consecutive flagged readings of the same kind and station form one interval.
+    """
+    cols = ["station_id", "kind", "start", "end", "readings"]
+    if "anomaly" not in facts or not facts["anomaly"].any():
+        return pd.DataFrame(columns=cols)
+
+    order = _order(facts)
+    sid = _sorted(facts, order, "station_id")
+    t = schemas.timestamps(_sorted(facts, order, "time"))
+    flags = _sorted(facts, order, "anomaly")
+    station_start = np.r_[True, sid[1:] != sid[:-1]]
+
+    parts = []
+    for bit, kind in KINDS.items():
+        on = (flags & bit) > 0
+        first = on & (station_start | ~np.r_[False, on[:-1]])
+        starts = np.flatnonzero(first)
+        if not len(starts):
+            continue
+        run = np.cumsum(first)[on] - 1
+        counts = np.bincount(run, minlength=len(starts))
+        ends = starts + counts - 1
+        parts.append(pd.DataFrame({
+            "station_id": sid[starts], "kind": kind,
+            "start": t[starts], "end": t[ends], "readings": counts,
+        }))
+    out = pd.concat(parts, ignore_index=True)
+    return out.sort_values(["readings", "start"], ascending=[False, True], ignore_index=True)[cols]
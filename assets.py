@@ -0,0 +1,104 @@
+# assets.py
+"""Images and icons, prepared once per process.
+
+Icons are resized and base64-encoded a single time (``data_url``) instead of
+on every rerun. Pictures are recompressed to WebP at the widths they are
+actually displayed at (``variant``) and written to ``static/img``, which
+Streamlit serves as plain files (``server.enableStaticServing``). ``image``
+renders them as ``<img loading="lazy">`` with a ``srcset``, so the browser
+downloads only the size it needs and only once the image scrolls into view.
+"""
+
+import base64
+import html
+import io
+import mimetypes
+import re
+from pathlib import Path
+
+import streamlit as st
+from PIL import Image
+
+BASE = Path(__file__).resolve().parent
+STATIC_DIR = BASE / "static" / "img"
+STATIC_URL = "app/static/img"
+
+# Widths generated for images that fill their column
+PYRAMID = (480, 960, 1600)
+
+
+def _open(path: str) -> Image.Image:
+    im = Image.open(BASE / path)
+    return im.convert("RGBA" if "A" in im.getbands() or im.mode == "P" else "RGB")
+
+
+@st.cache_resource
+def data_url(path: str, width: int | None = None) -> str:
+    """``data:`` URL of an asset, downscaled to ``width`` px if given.
+
+    Vector images (SVG) are embedded as they are.
+    """
+    mime = mimetypes.guess_type(path)[0] or "application/octet-stream"
+    if mime == "image/svg+xml" or width is None:
+        raw = (BASE / path).read_bytes()
+    else:
+        im = _open(path)
+        im.thumbnail((width, max(1, width * im.height // im.width)))
+        buf = io.BytesIO()
+        im.save(buf, format="PNG", optimize=True)
+        raw, mime = buf.getvalue(), "image/png"
+    return f"data:{mime};base64,{base64.b64encode(raw).decode('utf-8')}"
+
+
+@st.cache_resource
+def variant(path: str, width: int, quality: int = 80) -> str:
+    """Write a WebP copy of ``path`` at ``width`` px and return its URL.
+
+    Files are regenerated only when the source is newer than the copy.
+    """
+    src = BASE / path
+    slug = re.sub(r"[^A-Za-z0-9]+", "-", path).strip("-")
+    dst = STATIC_DIR / f"{slug}-{width}.webp"
+    if not dst.exists() or dst.stat().st_mtime < src.stat().st_mtime:
+        im = _open(path)
+        if im.width > width:
+            im = im.resize((width, round(im.height * width / im.width)), Image.LANCZOS)
+        STATIC_DIR.mkdir(parents=True, exist_ok=True)
+        im.save(dst, format="WEBP", quality=quality, method=4)
+    return f"{STATIC_URL}/{dst.name}"
+
+
+@st.cache_resource
+def _source_width(path: str) -> int:
+    with Image.open(BASE / path) as im:
+        return im.width
+
+
+def image(path: str, width: int | None = None, caption: str | None = None,
+          alt: str = "", sizes: str = "100vw"):
+    """Lazy-loaded ``<img>`` for ``path``.
+
+    With ``width`` the image is shown at that size (1x and 2x variants);
+    otherwise it fills its column and the browser picks from ``PYRAMID``
+    using the ``sizes`` hint (e.g. ``"50vw"`` inside two columns).
+    """
+    if width:
+        widths, sizes, style = (width, 2 * width), f"{width}px", f"width:{width}px;"
+    else:
+        widths, style = PYRAMID, "width:100%;"
+    src_w = _source_width(path)
+    widths = sorted({min(w, src_w) for w in widths})
+    srcset = ", ".join(f"{variant(path, w)} {w}w" for w in widths)
+
+    cap = (
+        f"<figcaption style='font-size:14px; color:#5f6368;'>{html.escape(caption)}</figcaption>"
+        if caption else ""
+    )
+    st.markdown(f"""
+      <figure style="margin:0 0 1rem 0;">
+        <img src="{variant(path, widths[-1])}" srcset="{srcset}" sizes="{sizes}"
+             style="{style} height:auto;" loading="lazy" decoding="async"
+             alt="{html.escape(alt or caption or '')}" />
+        {cap}
+      </figure>
+    """, unsafe_allow_html=True)
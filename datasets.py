@@ -0,0 +1,226 @@
+# datasets.py
+"""Shared read-only datasets for the Bicing app.
+
+Every dataset is loaded once per process with ``st.cache_resource`` and shared
+by all sessions, together with the derived columns the pages need (date, hour,
+season, holidays). Pages never get the shared frame itself:
+``Dataset.view()`` hands out a shallow copy and, with Copy-on-Write, any write
+on that copy (new column, ``.loc`` assignment, ...) stays local to the caller.
+Memory therefore grows with the number of datasets, not with the number of
+users.
+
+The release dataset is also stored in a compact typed layout (small integer
+ids, categoricals for repeated strings, ``int16`` counts, ``float32``
+coordinates, timestamps as ``uint32`` seconds that ``schemas.timestamps``
+turns back into datetimes), declared in ``schemas.SCHEMAS["release"]`` and
+produced by the parser itself; ``Dataset.report`` keeps the bytes per column
+before and after.
+Per-station attributes (name, cross street, coordinates, neighborhood,
+capacity) live only in the station master table (``station_master()``, see
+``stations.py``); the release facts carry just ``station_id``.
+"""
+
+import hashlib
+import os
+import sys
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+import requests
+import streamlit as st
+from dateutil.easter import easter
+
+import anomalies
+import schemas
+import stations
+
+# Copy-on-Write is always on from pandas 3.0; older versions need the flag so
+# that views handed to the pages can never write through to the shared frame.
+if int(pd.__version__.split(".")[0]) < 3:
+    pd.set_option("mode.copy_on_write", True)
+
+RELEASE_URL = (
+    "https://github.com/valosada/APP_Capstone_2025"
+    "/releases/download/v1.0/bicing_interactive_dataset.csv"
+)
+# Local file (or other URL) to use instead of the release, e.g. a load-test stand-in
+RELEASE_ENV = "BICING_DATASET"
+MARKERS_PATH = schemas.SCHEMAS["markers"].path
+SUBMISSION_PATH = "data/submission_local.csv"
+
+SEASONS = {
+    12: "Winter", 1: "Winter", 2: "Winter",
+    3: "Spring", 4: "Spring", 5: "Spring",
+    6: "Summer", 7: "Summer", 8: "Summer",
+    9: "Autumn", 10: "Autumn", 11: "Autumn",
+}
+FIXED_HOLIDAYS = {
+    "New Year":   (1, 1),
+    "Sant Jordi": (4, 23),
+    "Sant Joan":  (6, 24),
+    "La Mercè":   (9, 24),
+    "Christmas":  (12, 25),
+}
+
+
+@dataclass(frozen=True)
+class Dataset:
+    """One immutable dataset shared by every session of this process."""
+
+    name: str
+    _frame: pd.DataFrame
+    fingerprint: str
+    report: pd.DataFrame | None = None
+    rejected: pd.DataFrame | None = None
+
+    def view(self) -> pd.DataFrame:
+        """Return a private, copy-on-write view of the shared frame."""
+        return self._frame.copy(deep=False)
+
+    @property
+    def nbytes(self) -> int:
+        return int(self._frame.memory_usage(deep=True).sum())
+
+
+def fingerprint(df: pd.DataFrame) -> str:
+    """Content hash of a frame, used as cache key by downstream consumers."""
+    hashed = pd.util.hash_pandas_object(df, index=False).to_numpy()
+    return hashlib.sha1(hashed.tobytes()).hexdigest()[:16]
+
+
+def _freeze(name: str, df: pd.DataFrame, report: pd.DataFrame | None = None,
+            rejected: pd.DataFrame | None = None) -> Dataset:
+    return Dataset(name=name, _frame=df, fingerprint=fingerprint(df), report=report, rejected=rejected)
+
+
+# ─── COMPACT LAYOUT ─────────────────────────────────────────
+def usage(df: pd.DataFrame) -> pd.DataFrame:
+    """dtype and bytes of each column as stored."""
+    return pd.DataFrame({
+        "dtype": df.dtypes.astype(str),
+        "bytes": df.memory_usage(deep=True, index=False),
+    })
+
+
+def default_usage(df: pd.DataFrame, dates=()) -> pd.DataFrame:
+    """dtype and bytes of each column in pandas' default inferred layout.
+
+    That is what ``read_csv`` gives without declared types: ``int64``,
+    ``float64`` and ``datetime64[ns]`` take 8 bytes a row, and text is one
+    Python ``str`` per row plus its pointer (``object``). Strings are sized
+    once per distinct value, so this is cheap even for millions of rows.
+    ``dates`` are timestamp columns stored in another form (packed seconds).
+    """
+    rows = {}
+    for col, s in df.items():
+        if pd.api.types.is_datetime64_any_dtype(s) or col in dates:
+            rows[col] = ("datetime64[ns]", 8 * len(s))
+        elif pd.api.types.is_numeric_dtype(s) and not isinstance(s.dtype, pd.CategoricalDtype):
+            kind = "int64" if pd.api.types.is_integer_dtype(s) and not s.hasnans else "float64"
+            rows[col] = (kind, 8 * len(s))
+        else:
+            counts = s.value_counts(dropna=False)
+            sizes = np.array([sys.getsizeof(v if isinstance(v, str) else np.nan) for v in counts.index])
+            rows[col] = ("object", 8 * len(s) + int(sizes @ counts.to_numpy()))
+    return pd.DataFrame.from_dict(rows, orient="index", columns=["dtype", "bytes"])
+
+
+def memory_report(before: pd.DataFrame, after: pd.DataFrame, extra: dict | None = None) -> pd.DataFrame:
+    """Bytes per column of two layouts (``usage`` tables) of the same data, plus a total row.
+
+    ``extra`` adds whole tables (e.g. a dimension table split out of the data)
+    as one row each on the ``after`` side. Columns that are gone in ``after``
+    have no ratio.
+    """
+    rep = before.join(after, how="outer", lsuffix="_before", rsuffix="_after")
+    for label, table in (extra or {}).items():
+        rep.loc[label] = [None, 0, "table", table.memory_usage(deep=True).sum()]
+    rep[["dtype_before", "dtype_after"]] = rep[["dtype_before", "dtype_after"]].fillna("")
+    rep[["bytes_before", "bytes_after"]] = rep[["bytes_before", "bytes_after"]].fillna(0).astype("int64")
+    rep.loc["TOTAL"] = ["", rep["bytes_before"].sum(), "", rep["bytes_after"].sum()]
+    measured = (rep["bytes_before"] > 0) & (rep["bytes_after"] > 0)
+    rep["ratio"] = (rep["bytes_before"] / rep["bytes_after"]).where(measured).round(1)
+    return rep
+
+
+# ─── DERIVED COLUMNS ────────────────────────────────────────
+def _holidays(years) -> dict:
+    hols = {}
+    for y in years:
+        for name, (m, d) in FIXED_HOLIDAYS.items():
+            hols.setdefault(pd.Timestamp(y, m, d), name)
+        hols.setdefault(pd.Timestamp(easter(y)), "Easter")
+    return hols
+
+
+def add_derived_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """Add the calendar columns used across the pages."""
+    t = schemas.timestamps(df["time"]).dt
+    date = t.normalize()
+    df["date"] = date.astype("category")
+    df["hour"] = t.hour.astype("int8")
+    df["season"] = t.month.map(SEASONS).astype("category")
+
+    holiday = date.map(_holidays(sorted(t.year.unique())))
+    holiday = holiday.mask((t.month == 8) & holiday.isna(), "August vacation")
+    df["holiday"] = holiday.astype("category")
+    df["is_holiday"] = holiday.notna()
+    return df
+
+
+# ─── LOADERS ────────────────────────────────────────────────
+@st.cache_resource(show_spinner="Loading Bicing dataset…")
+def _release_tables() -> tuple[Dataset, Dataset, Dataset]:
+    source = os.environ.get(RELEASE_ENV, RELEASE_URL)
+    if source.startswith(("http://", "https://")):
+        resp = requests.get(source)
+        resp.raise_for_status()
+        source = resp.content
+    # Declared columns and types (schemas.py); rows without a count are rejected
+    raw, rejected = schemas.read("release", source)
+
+    master, marker_ids = stations.load(raw)
+    facts = raw.drop(columns=stations.FACT_COLUMNS, errors="ignore")
+    facts = add_derived_columns(facts)
+    # Broken-feed readings stay in the table, flagged; metrics skip them
+    facts["anomaly"] = anomalies.detect(facts, master)
+    # "Before" is the untyped layout the release used to be loaded in
+    report = memory_report(
+        default_usage(raw, dates=schemas.SCHEMAS["release"].dates),
+        usage(facts), extra={"station table": master},
+    )
+    return (
+        _freeze("release", facts, report=report, rejected=rejected),
+        _freeze("stations", master),
+        _freeze("marker ids", marker_ids),
+    )
+
+
+def release() -> Dataset:
+    """Release dataset (station availability time series), keyed by ``station_id``."""
+    return _release_tables()[0]
+
+
+def station_master() -> Dataset:
+    """One row per station, indexed by ``station_id`` (see ``stations.build``)."""
+    return _release_tables()[1]
+
+
+@st.cache_resource
+def markers(path: str = MARKERS_PATH) -> Dataset:
+    """Current stations and proposals shown on the Maps page."""
+    df, rejected = schemas.read("markers", path)
+    df["type"] = df["type"].str.strip().str.lower()
+
+    # Name-only source: matched once while building the station table, joined here
+    _, master, marker_ids = _release_tables()
+    df = df.merge(marker_ids.view(), on=stations.MARKER_KEY, how="left")
+    df["capacity"] = stations.lookup(master.view(), df["station_id"], "capacity")
+    return _freeze("markers", df, rejected=rejected)
+
+
+@st.cache_resource
+def submission(path: str = SUBMISSION_PATH) -> Dataset:
+    """Local Kaggle submission file."""
+    return _freeze("submission", pd.read_csv(path))
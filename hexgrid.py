@@ -0,0 +1,115 @@
+# hexgrid.py
+"""Hexagonal grid over the city for zoom-dependent map layers.
+
+Stations are binned into pointy-top hexagons of a few fixed sizes (metres,
+centre to vertex) on the flat projection of ``stations.project``, using
+axial coordinates and cube rounding in numpy. ``assign`` does it once for every
+size; ``aggregate`` rolls the per-station hourly table (``metrics.hourly``) up
+to cells, so drawing a layer only touches a few hundred rows.
+
+Each size is meant for a range of zoom levels (``LEVELS``): at a given zoom the
+screen covers roughly the same number of cells, so the payload sent to the
+browser doesn't grow with the number of stations or the length of the history.
+Past the finest level, stations are drawn one by one.
+"""
+
+import numpy as np
+import pandas as pd
+
+import stations
+
+# Hexagon size (m) → highest zoom level it is drawn at; above the last one, stations
+LEVELS = {1000: 12, 500: 13, 250: 14}
+SIZES = tuple(LEVELS)
+
+_OFFSET = 2**15  # cell id = (q + offset) * 2**16 + (r + offset)
+
+
+def cells(lat, lon, size: float) -> np.ndarray:
+    """Id of the hexagon of ``size`` metres containing each point."""
+    x, y = stations.project(lat, lon)
+    q = (np.sqrt(3) / 3 * x - y / 3) / size
+    r = (2 / 3 * y) / size
+    # Cube rounding: round all three coordinates, fix the one that moved most
+    s = -q - r
+    rq, rr, rs = np.round(q), np.round(r), np.round(s)
+    dq, dr, ds = np.abs(rq - q), np.abs(rr - r), np.abs(rs - s)
+    fix_q = (dq > dr) & (dq > ds)
+    fix_r = ~fix_q & (dr > ds)
+    rq = np.where(fix_q, -rr - rs, rq)
+    rr = np.where(fix_r, -rq - rs, rr)
+    return (rq.astype("int64") + _OFFSET) * 2**16 + (rr.astype("int64") + _OFFSET)
+
+
+def _centers_xy(ids, size: float):
+    ids = np.asarray(ids, dtype="int64")
+    q = ids // 2**16 - _OFFSET
+    r = ids % 2**16 - _OFFSET
+    return size * np.sqrt(3) * (q + r / 2), size * 1.5 * r
+
+
+def centers(ids, size: float) -> tuple[np.ndarray, np.ndarray]:
+    """(lat, lon) of each cell centre."""
+    return stations.unproject(*_centers_xy(ids, size))
+
+
+def polygons(ids, size: float) -> np.ndarray:
+    """Vertices of each cell as (n, 7, 2) [lon, lat] rings (closed, GeoJSON order)."""
+    cx, cy = _centers_xy(ids, size)
+    angles = np.radians(30 + 60 * np.arange(7))
+    lat, lon = stations.unproject(cx[:, None] + size * np.cos(angles), cy[:, None] + size * np.sin(angles))
+    return np.stack([lon, lat], axis=-1)
+
+
+def level(zoom: float) -> int | None:
+    """Hexagon size to draw at ``zoom``; ``None`` means individual stations."""
+    for size, max_zoom in LEVELS.items():
+        if zoom <= max_zoom:
+            return size
+    return None
+
+
+# ─── AGGREGATES ─────────────────────────────────────────────
+def assign(master: pd.DataFrame, sizes=SIZES) -> pd.DataFrame:
+    """Cell id of every station at each size: index station_id, one column per size."""
+    located = master.dropna(subset=["latitude", "longitude"])
+    return pd.DataFrame(
+        {size: cells(located["latitude"], located["longitude"], size) for size in sizes},
+        index=located.index,
+    )
+
+
+def aggregate(hourly: pd.DataFrame, master: pd.DataFrame, grid: pd.DataFrame, size: int) -> pd.DataFrame:
+    """Per (cell, hour): stations, bikes, capacity, fill (bikes / capacity) and turnover.
+
+    ``hourly`` is ``metrics.hourly`` (index station_id, hour) and ``grid`` comes
+    from ``assign``. Fill only counts stations with a known capacity.
+    """
+    d = hourly.reset_index().join(grid[size].rename("cell"), on="station_id", how="inner")
+    cap = master["capacity"].astype("Float64").reindex(d["station_id"]).to_numpy(dtype="float64", na_value=np.nan)
+    d["capacity"] = cap
+    d["bikes_known"] = d["available_bikes"].where(~np.isnan(cap))
+    out = d.groupby(["cell", "hour"]).agg(
+        stations=("station_id", "nunique"),
+        bikes=("available_bikes", "sum"),
+        bikes_known=("bikes_known", "sum"),
+        capacity=("capacity", "sum"),
+        turnover=("mean_variation", "mean"),
+    )
+    out["fill"] = (out["bikes_known"] / out["capacity"].where(out["capacity"] > 0)).clip(0, 1)
+    return out.drop(columns="bikes_known")
+
+
+def geojson(table: pd.DataFrame, size: int, columns=("stations", "bikes", "fill", "turnover")) -> dict:
+    """GeoJSON FeatureCollection of cells (index = cell id) with ``columns`` as properties."""
+    rings = polygons(table.index.to_numpy(), size).round(6).tolist()
+    props = table[list(columns)].astype(object).where(table[list(columns)].notna(), None).to_dict("records")
+    return {
+        "type": "FeatureCollection",
+        "features": [
+            {"type": "Feature", "id": int(cell),
+             "geometry": {"type": "Polygon", "coordinates": [ring]},
+             "properties": p}
+            for cell, ring, p in zip(table.index, rings, props)
+        ],
+    }
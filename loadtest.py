@@ -0,0 +1,257 @@
+# loadtest.py
+"""Concurrent-session load test for the Bicing app.
+
+Drives N headless sessions (Streamlit ``AppTest``) at the same time through a
+realistic visit:
+
+    Home → Maps (filter toggles) → Stats → Ranking → Prediction
+
+and records, per page, rerun latency (p50/p95/p99), CPU seconds spent during
+the rerun and resident memory after it. The app reads a local dataset
+stand-in (``BICING_DATASET``), generated from the station list if not given.
+
+    python loadtest.py --sessions 20 --rounds 3 --out report.json
+    python loadtest.py --sessions 20 --baseline report.json   # exit 1 on regression
+
+``AppTest`` keeps its runtime in a process-wide singleton, so two sessions
+can't share a process: each session runs in its own worker process, warms
+its caches there, and all of them start the visit together. Caches are
+therefore per session, not shared as on one server, and CPU and memory are
+per session. A session that fails is listed in the report and fails the run,
+so its missing samples can't slip past ``--baseline``.
+"""
+
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import queue
+import resource
+import sys
+import tempfile
+import time
+import traceback
+
+import numpy as np
+import pandas as pd
+
+import schemas
+
+APP = os.path.join(os.path.dirname(os.path.abspath(__file__)), "App v8.py")
+
+NAV = {
+    "Home": "🏠 Home",
+    "Prediction": "🏁 Kaggle Submission",
+    "Maps": "🗺️ Maps",
+    "Stats": "📊 Stats",
+    "Ranking": "🏆 Ranking",
+}
+
+
+# ─── DATASET STAND-IN ───────────────────────────────────────
+def make_standin(path: str, days: int = 30, freq: str = "5min", seed: int = 0) -> str:
+    """Write a synthetic release dataset (bounded random walk per station) to ``path``."""
+    info, _ = schemas.read("stations")
+    rng = np.random.default_rng(seed)
+    times = pd.date_range("2024-06-01", periods=days * pd.Timedelta("1D") // pd.Timedelta(freq), freq=freq)
+    n, k = len(info), len(times)
+
+    cap = np.maximum(info["capacity"].to_numpy(dtype="int64", na_value=1), 1)[:, None]
+    walk = rng.integers(-2, 3, (n, k)).cumsum(axis=1) + rng.integers(0, cap + 1)
+    # Reflect at 0 and capacity (clipping would pin stations there for days,
+    # which anomalies.detect rightly takes for a frozen feed)
+    bikes = np.abs((walk + cap) % (2 * cap) - cap)
+
+    df = pd.DataFrame({
+        "station_id": np.repeat(info["station_id"].to_numpy(), k),
+        "name": np.repeat(info["name"].to_numpy(), k),
+        "latitude": np.repeat(info["lat"].to_numpy(), k),
+        "longitude": np.repeat(info["lon"].to_numpy(), k),
+        "time": np.tile(times, n),
+        "available_bikes": bikes.ravel(),
+        "cross_street": np.repeat(info["cross_street"].to_numpy(), k),
+    })
+    df.to_csv(path, index=False)
+    return path
+
+
+# ─── MEASUREMENTS ───────────────────────────────────────────
+def rss_mb() -> float:
+    """Current resident memory of this process (peak if /proc is unavailable)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except OSError:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+
+
+def _step(at, page, samples, action=None):
+    cpu0, t0 = time.process_time(), time.perf_counter()
+    (action() if action else at).run()
+    wall, cpu = time.perf_counter() - t0, time.process_time() - cpu0
+    samples.append({
+        "page": page, "latency_s": wall, "cpu_s": cpu, "rss_mb": rss_mb(),
+        "errors": len(at.exception),
+    })
+
+
+def session(rounds: int, samples: list, timeout: float):
+    """One user: load Home, then walk through the pages ``rounds`` times."""
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(APP, default_timeout=timeout)
+    _step(at, "Home", samples)
+
+    def nav(page):
+        button = next((b for b in at.button if b.label == NAV[page]), None)
+        if button is None:
+            raise RuntimeError(f"no navigation button for {page} (did the last rerun fail?)")
+        return button.click
+
+    for _ in range(rounds):
+        _step(at, "Maps", samples, nav("Maps"))
+        # Filter toggles: only current stations, then everything again
+        for value in (["old"], ["new", "old"]):
+            _step(at, "Maps (filter)", samples, lambda v=value: at.multiselect[0].set_value(v))
+        for page in ("Stats", "Ranking", "Prediction", "Home"):
+            _step(at, page, samples, nav(page))
+
+
+def worker(index: int, rounds: int, timeout: float, start, results):
+    """Session ``index`` in its own process: warm up, wait for the others, measure.
+
+    Always puts one result on ``results``, with the traceback if it failed.
+    """
+    # Page errors are counted in the report; keep their tracebacks out of it
+    logging.disable(logging.ERROR)
+    samples, error, t0 = [], None, time.time()
+    try:
+        # Warm this process' caches so the session measures steady-state reruns
+        session(1, [], timeout)
+    except Exception:
+        error = traceback.format_exc()
+    try:
+        # The slowest worker may still be in its warm-up walk (8 reruns)
+        start.wait(8 * timeout)
+        t0 = time.time()
+        if error is None:
+            session(rounds, samples, timeout)
+    except Exception:
+        error = error or traceback.format_exc()
+    results.put({"session": index, "samples": samples, "error": error,
+                 "start": t0, "end": time.time(), "rss_mb": rss_mb()})
+
+
+def run_sessions(n: int, rounds: int, timeout: float) -> list[dict]:
+    """Run ``n`` ``worker`` processes; sessions that died without a result get an error entry."""
+    ctx = multiprocessing.get_context("spawn")
+    start, results = ctx.Barrier(n), ctx.Queue()
+    procs = [ctx.Process(target=worker, args=(i, rounds, timeout, start, results)) for i in range(n)]
+    for p in procs:
+        p.start()
+
+    # Drain the queue before joining, or workers block on flushing it
+    out = {}
+    while len(out) < n:
+        try:
+            r = results.get(timeout=1)
+            out[r["session"]] = r
+        except queue.Empty:
+            if not any(p.is_alive() for p in procs) and results.empty():
+                break
+    for p in procs:
+        p.join()
+    for i, p in enumerate(procs):
+        if i not in out:
+            out[i] = {"session": i, "samples": [], "start": None, "end": None, "rss_mb": None,
+                      "error": f"worker process exited with code {p.exitcode} without a result"}
+    return [out[i] for i in range(n)]
+
+
+def report(samples: list) -> pd.DataFrame:
+    df = pd.DataFrame(samples)
+    lat = df.groupby("page", sort=False)["latency_s"]
+    return pd.DataFrame({
+        "reruns": lat.size(),
+        "p50_s": lat.quantile(0.50),
+        "p95_s": lat.quantile(0.95),
+        "p99_s": lat.quantile(0.99),
+        "cpu_s_mean": df.groupby("page", sort=False)["cpu_s"].mean(),
+        "rss_mb_max": df.groupby("page", sort=False)["rss_mb"].max(),
+        "errors": df.groupby("page", sort=False)["errors"].sum(),
+    }).round(3)
+
+
+def regressions(current: pd.DataFrame, baseline: dict, tolerance: float) -> list[str]:
+    """Pages whose p95 latency grew more than ``tolerance`` over the baseline."""
+    out = []
+    for page, row in current.iterrows():
+        old = baseline.get("pages", {}).get(page)
+        if old and row["p95_s"] > old["p95_s"] * (1 + tolerance):
+            out.append(f"{page}: p95 {old['p95_s']:.3f}s → {row['p95_s']:.3f}s")
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent-session load test for the Bicing app.")
+    parser.add_argument("--sessions", type=int, default=10, help="concurrent sessions")
+    parser.add_argument("--rounds", type=int, default=2, help="page walks per session")
+    parser.add_argument("--dataset", help="release dataset stand-in (CSV); generated if missing")
+    parser.add_argument("--days", type=int, default=30, help="days of data in a generated stand-in")
+    parser.add_argument("--timeout", type=float, default=300, help="seconds per rerun before failing")
+    parser.add_argument("--out", help="write the report as JSON")
+    parser.add_argument("--baseline", help="JSON report to compare p95 latency against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed p95 regression (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    # The app opens its data files relative to the repo root
+    os.chdir(os.path.dirname(APP))
+    dataset = args.dataset or os.path.join(tempfile.gettempdir(), f"bicing-standin-{args.days}d.csv")
+    if not os.path.exists(dataset):
+        print(f"Generating stand-in dataset {dataset} ({args.days} days)…")
+        make_standin(dataset, days=args.days)
+    os.environ["BICING_DATASET"] = dataset
+
+    runs = run_sessions(args.sessions, args.rounds, args.timeout)
+    failed = [r for r in runs if r["error"]]
+    ok = [r for r in runs if not r["error"]]
+    samples = [s for r in ok for s in r["samples"]]
+    elapsed = max(r["end"] for r in ok) - min(r["start"] for r in ok) if ok else 0.0
+    rss = [r["rss_mb"] for r in ok]
+
+    print(f"\n{args.sessions} sessions × {args.rounds} rounds in {elapsed:.1f}s, "
+          f"{len(failed)} failed (RSS per session up to {max(rss, default=0):.0f} MB)\n")
+    if samples:
+        table = report(samples)
+        print(table.to_string())
+    else:
+        table = pd.DataFrame()
+    for r in failed:
+        print(f"\nSession {r['session']} failed:\n{r['error']}")
+
+    result = {
+        "sessions": args.sessions, "rounds": args.rounds, "dataset": dataset,
+        "elapsed_s": round(elapsed, 2), "rss_mb_max": round(max(rss, default=0), 1),
+        "failed_sessions": [{"session": r["session"], "error": r["error"]} for r in failed],
+        "pages": table.to_dict(orient="index"),
+    }
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(result, f, indent=2)
+
+    # Lost sessions mean missing samples: the numbers above can't be trusted
+    if failed:
+        sys.exit(1)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressed = regressions(table, json.load(f), args.tolerance)
+        if regressed:
+            print("\nRegressions:\n  " + "\n  ".join(regressed))
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
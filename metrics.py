@@ -0,0 +1,141 @@
+# metrics.py
+"""Numbers behind the Stats and Ranking pages.
+
+Plain pandas functions over the release facts and the station master table,
+shared by the Streamlit pages and the JSON API (``metrics_api.py``). They
+return raw values; rounding and labels are left to the caller. Readings
+flagged by ``anomalies.detect`` (frozen feeds, impossible values, spikes) are
+left out, so a broken sensor doesn't pass for an empty or full station.
+"""
+
+import numpy as np
+import pandas as pd
+
+import anomalies
+
+PROBLEM_RATIO = 0.1  # "remains empty/full more than 10% of the time"
+
+
+# ─── RANKING ────────────────────────────────────────────────
+def _changes(facts: pd.DataFrame, *keys: str) -> tuple[pd.DataFrame, np.ndarray]:
+    """Absolute change of ``available_bikes`` between consecutive readings of each station.
+
+    One sort and one ``np.diff`` over the whole table; differences that cross
+    from one station to the next are masked out. Returns station_id, ``keys``
+    (of the later reading) and change, plus every station id seen.
+    """
+    d = facts[["station_id", "time", "available_bikes", *keys]].sort_values(["station_id", "time"])
+    sid = d["station_id"].to_numpy()
+    bikes = d["available_bikes"].to_numpy(dtype="float64")
+    same = sid[1:] == sid[:-1]
+    out = pd.DataFrame({"station_id": sid[1:][same]})
+    for k in keys:
+        out[k] = d[k].to_numpy()[1:][same]
+    out["change"] = np.abs(np.diff(bikes))[same]
+    return out, np.unique(sid)
+
+
+def turnover(facts: pd.DataFrame) -> pd.Series:
+    """Mean absolute change of ``available_bikes`` between consecutive readings, per station."""
+    facts = anomalies.clean(facts)
+    change, ids = _changes(facts)
+    return change.groupby("station_id")["change"].mean().reindex(ids).rename("mean_variation").rename_axis("station_id")
+
+
+def top_turnover(facts: pd.DataFrame, master: pd.DataFrame, n: int = 10) -> pd.DataFrame:
+    """Stations with the highest turnover: station_id, name, mean_variation."""
+    top = turnover(facts).reset_index().join(master["name"], on="station_id", how="inner")
+    return top.sort_values("mean_variation", ascending=False).head(n).reset_index(drop=True)
+
+
+def empty_full(facts: pd.DataFrame, master: pd.DataFrame, threshold: float = PROBLEM_RATIO,
+               n: int = 10) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """Stations empty / full (at their observed maximum) more than ``threshold`` of the time.
+
+    Returns two frames (station_id, name, empty_ratio) and
+    (station_id, name, full_ratio), worst first.
+    """
+    facts = anomalies.clean(facts)
+    bikes = facts["available_bikes"]
+    by = facts["station_id"]
+    ratios = pd.DataFrame({
+        "empty_ratio": (bikes == 0).groupby(by).mean(),
+        "full_ratio": (bikes == bikes.groupby(by).transform("max")).groupby(by).mean(),
+    }).rename_axis("station_id")
+
+    def worst(col):
+        return (
+            ratios.loc[ratios[col] > threshold, [col]]
+            .join(master["name"], how="inner")
+            .sort_values(col, ascending=False)
+            .head(n)
+            .reset_index()[["station_id", "name", col]]
+        )
+
+    return worst("empty_ratio"), worst("full_ratio")
+
+
+def neighborhoods(facts: pd.DataFrame, master: pd.DataFrame,
+                  station_turnover: pd.Series | None = None) -> tuple[pd.Series, pd.Series]:
+    """Per neighborhood: mean station turnover (desc) and mean available bikes (asc)."""
+    facts = anomalies.clean(facts)
+    barrio = master["neighborhood"].dropna()
+    if station_turnover is None:
+        station_turnover = turnover(facts)
+
+    rot = (
+        station_turnover.to_frame()
+        .join(barrio, how="inner")
+        .groupby("neighborhood", observed=True)["mean_variation"]
+        .mean()
+        .sort_values(ascending=False)
+    )
+    # Row-weighted mean from per-station sums and counts
+    per_station = (
+        facts.groupby("station_id")["available_bikes"]
+        .agg(["sum", "count"])
+        .join(barrio, how="inner")
+        .groupby("neighborhood", observed=True)[["sum", "count"]]
+        .sum()
+    )
+    sat = (per_station["sum"] / per_station["count"]).rename("available_bikes").sort_values()
+    return rot, sat
+
+
+# ─── MAPS ───────────────────────────────────────────────────
+def hourly(facts: pd.DataFrame) -> pd.DataFrame:
+    """Per (station_id, hour): mean available_bikes and mean_variation (turnover)."""
+    facts = anomalies.clean(facts)
+    change, _ = _changes(facts, "hour")
+    out = facts.groupby(["station_id", "hour"])["available_bikes"].mean().to_frame()
+    out["mean_variation"] = change.groupby(["station_id", "hour"])["change"].mean()
+    return out
+
+
+# ─── STATS ──────────────────────────────────────────────────
+def season_profile(facts: pd.DataFrame) -> pd.DataFrame:
+    """Mean available bikes per (season, hour): season, hour, avg_bikes."""
+    facts = anomalies.clean(facts)
+    return (
+        facts.groupby(["season", "hour"], observed=True)["available_bikes"]
+        .mean()
+        .reset_index(name="avg_bikes")
+    )
+
+
+def holiday_profile(facts: pd.DataFrame) -> pd.DataFrame:
+    """Mean available bikes per hour, workdays (``False``) vs holidays/August (``True``)."""
+    facts = anomalies.clean(facts)
+    return facts.groupby(["hour", "is_holiday"])["available_bikes"].mean().unstack()
+
+
+def holidays_by_hour(facts: pd.DataFrame) -> pd.DataFrame:
+    """Mean available bikes per hour (rows) for each holiday (columns, in order of appearance)."""
+    facts = anomalies.clean(facts)
+    order = facts["holiday"].dropna().unique().tolist()
+    table = (
+        facts.groupby(["hour", "holiday"], observed=True)["available_bikes"]
+        .mean()
+        .unstack()
+    )
+    return table.reindex(columns=order)
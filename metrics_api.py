@@ -0,0 +1,150 @@
+# metrics_api.py
+"""Read-only JSON API with the numbers behind the Ranking and Stats pages.
+
+Runs as its own process, without the Streamlit UI:
+
+    python metrics_api.py --port 8502
+
+Endpoints (all GET, JSON):
+
+    /                   dataset fingerprint and list of endpoints
+    /top-turnover       ?n=10            stations with the highest turnover
+    /empty-full         ?n=10&threshold=0.1
+    /neighborhoods      ?n=10            turnover and saturation per neighborhood
+    /season-profile                      mean bikes per season and hour
+    /holiday-profile                     workday vs holiday, and per holiday, by hour
+
+Responses are computed with ``metrics.py`` once per dataset fingerprint and
+query, then served from memory with an ``ETag`` (``If-None-Match`` gets a 304)
+and gzip when the client accepts it.
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+import datasets
+import metrics
+
+
+def _records(df):
+    return json.loads(df.to_json(orient="records"))
+
+
+def _series(s):
+    return [{"name": k, "value": v} for k, v in json.loads(s.to_json()).items()]
+
+
+def _top_turnover(facts, master, n: int = 10):
+    return _records(metrics.top_turnover(facts, master, n))
+
+
+def _empty_full(facts, master, n: int = 10, threshold: float = metrics.PROBLEM_RATIO):
+    empty, full = metrics.empty_full(facts, master, threshold, n)
+    return {"empty": _records(empty), "full": _records(full)}
+
+
+def _neighborhoods(facts, master, n: int = 10):
+    rot, sat = metrics.neighborhoods(facts, master)
+    return {"turnover": _series(rot.head(n)), "saturation": _series(sat.head(n))}
+
+
+def _season_profile(facts, master):
+    return _records(metrics.season_profile(facts))
+
+
+def _holiday_profile(facts, master):
+    cmp = metrics.holiday_profile(facts).rename(columns={False: "workday", True: "holiday"})
+    return {
+        "workday_vs_holiday": _records(cmp.reset_index()),
+        "by_holiday": _records(metrics.holidays_by_hour(facts).reset_index()),
+    }
+
+
+# path → (handler, {query param: type})
+ENDPOINTS = {
+    "/top-turnover":    (_top_turnover, {"n": int}),
+    "/empty-full":      (_empty_full, {"n": int, "threshold": float}),
+    "/neighborhoods":   (_neighborhoods, {"n": int}),
+    "/season-profile":  (_season_profile, {}),
+    "/holiday-profile": (_holiday_profile, {}),
+}
+
+
+@lru_cache(maxsize=256)
+def render(fingerprint: str, path: str, query: tuple) -> tuple[str, bytes, bytes]:
+    """ETag, JSON body and its gzip for one endpoint call on one dataset version."""
+    if path == "/":
+        payload = {"fingerprint": fingerprint, "endpoints": sorted(ENDPOINTS)}
+    else:
+        handler, _ = ENDPOINTS[path]
+        payload = handler(datasets.release().view(), datasets.station_master().view(), **dict(query))
+    body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    etag = '"' + hashlib.sha1(f"{fingerprint}{path}{query}".encode()).hexdigest()[:20] + '"'
+    return etag, body, gzip.compress(body, compresslevel=6)
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    server_version = "BicingMetrics/1.0"
+
+    def _send(self, status: int, body: bytes = b"", headers: dict | None = None):
+        self.send_response(status)
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    def _error(self, status: int, message: str):
+        body = json.dumps({"error": message}).encode("utf-8")
+        self._send(status, body, {"Content-Type": "application/json; charset=utf-8"})
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        path = url.path.rstrip("/") or "/"
+        if path != "/" and path not in ENDPOINTS:
+            return self._error(404, f"unknown endpoint {path}")
+
+        types = ENDPOINTS[path][1] if path in ENDPOINTS else {}
+        try:
+            query = tuple(sorted((k, types[k](v)) for k, v in parse_qsl(url.query)))
+        except (KeyError, ValueError) as e:
+            return self._error(400, f"bad query parameter: {e}")
+
+        etag, body, gz = render(datasets.release().fingerprint, path, query)
+        headers = {
+            "ETag": etag,
+            "Cache-Control": "public, max-age=60",
+            "Vary": "Accept-Encoding",
+        }
+        if etag in self.headers.get("If-None-Match", ""):
+            return self._send(304, headers=headers)
+
+        headers["Content-Type"] = "application/json; charset=utf-8"
+        if "gzip" in self.headers.get("Accept-Encoding", ""):
+            body, headers["Content-Encoding"] = gz, "gzip"
+        self._send(200, body, headers)
+
+    do_HEAD = do_GET
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8502)
+    args = parser.parse_args()
+
+    # Load the dataset before accepting requests
+    print(f"Dataset {datasets.release().fingerprint} loaded")
+    server = ThreadingHTTPServer((args.host, args.port), MetricsHandler)
+    print(f"Serving metrics on http://{args.host}:{args.port}/")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
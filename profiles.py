@@ -0,0 +1,110 @@
+# profiles.py
+"""Station archetypes from their typical day.
+
+Each station gets a 24-value profile: mean available bikes per hour of day
+as a share of its capacity, minus its own daily mean, so stations of any size
+compare by shape (when they fill and empty) rather than by level. Optionally
+workdays and non-working days (weekends and holidays) get 24 values each. The station × hour matrix comes
+from a single groupby/unstack over the release facts; ``cluster`` groups it
+with scikit-learn's ``MiniBatchKMeans`` and names each cluster after its
+centre, e.g. "morning sink" for stations that fill up as people arrive to
+work.
+"""
+
+import numpy as np
+import pandas as pd
+from sklearn.cluster import MiniBatchKMeans
+
+import anomalies
+import schemas
+import stations
+
+N_CLUSTERS = 5
+
+# Hours compared to name a cluster centre (change in fill share)
+MORNING = (range(5, 7), range(9, 12))    # before → after the morning commute
+EVENING = (range(15, 17), range(19, 22))  # before → after the evening commute
+FLAT = 0.05                                # smaller changes count as "balanced"
+
+# One palette for categories on the Maps page (profile clusters, rebalancing vans)
+COLORS = ["#1a73e8", "#e8711a", "#188038", "#a142f4", "#d93025",
+          "#12b5cb", "#f9ab00", "#5f6368", "#e52592", "#795548"]
+
+
+def matrix(facts: pd.DataFrame, master: pd.DataFrame, by_daytype: bool = False) -> pd.DataFrame:
+    """Normalized profile per station: index station_id, one column per hour.
+
+    With ``by_daytype`` the columns are (is_workday, hour). Hours without
+    readings get the station's mean (0 after centring).
+    """
+    facts = anomalies.clean(facts)
+    keys = [facts["station_id"], facts["hour"]]
+    if by_daytype:
+        keys.insert(1, workdays(facts))
+    mean = facts.groupby(keys, observed=True)["available_bikes"].mean()
+    prof = mean.unstack(list(range(1, len(keys))))
+
+    cap = stations.capacity(master, facts).reindex(prof.index).to_numpy(dtype="float64", na_value=np.nan)
+    keep = cap > 0
+    prof, cap = prof.loc[keep], cap[keep]
+
+    share = prof.to_numpy(dtype="float64") / cap[:, None]
+    share -= np.nanmean(share, axis=1, keepdims=True)
+    return pd.DataFrame(np.nan_to_num(share), index=prof.index, columns=prof.columns)
+
+
+def workdays(facts: pd.DataFrame) -> pd.Series:
+    """Monday to Friday outside holidays; weekends have no commute either."""
+    return ((schemas.timestamps(facts["time"]).dt.dayofweek < 5) & ~facts["is_holiday"]).rename("is_workday")
+
+
+def daily(profile):
+    """Mean over day types when the index is (is_workday, hour), e.g. ``centers.T``."""
+    if isinstance(profile.index, pd.MultiIndex):
+        return profile.groupby(level="hour").mean()
+    return profile
+
+
+def name(center: pd.Series) -> str:
+    """Archetype for a cluster centre, from its strongest commute-time change."""
+    day = daily(center).reindex(range(24), fill_value=0.0)
+    changes = {
+        "morning": day[list(MORNING[1])].mean() - day[list(MORNING[0])].mean(),
+        "evening": day[list(EVENING[1])].mean() - day[list(EVENING[0])].mean(),
+    }
+    when, delta = max(changes.items(), key=lambda kv: abs(kv[1]))
+    if abs(delta) < FLAT:
+        return "balanced"
+    # Bikes arriving → the station is a sink at that time of day
+    return f"{when} {'sink' if delta > 0 else 'source'}"
+
+
+def cluster(profile: pd.DataFrame, k: int = N_CLUSTERS, seed: int = 0) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """Cluster ``matrix`` rows into ``k`` archetypes.
+
+    Returns (per station: cluster, archetype, color) and the cluster centres
+    (one row per cluster, same columns as ``profile``). Clusters are numbered
+    by size, largest first; repeated archetype names get a number.
+    """
+    k = max(1, min(k, len(profile)))
+    model = MiniBatchKMeans(n_clusters=k, random_state=seed, n_init=3, batch_size=1024)
+    labels = model.fit_predict(profile.to_numpy())
+
+    # Renumber by size: the largest cluster always gets the first color
+    sizes = np.bincount(labels, minlength=k)
+    rank = np.empty(k, dtype=int)
+    rank[np.argsort(-sizes, kind="stable")] = np.arange(k)
+    labels = rank[labels]
+    centers = pd.DataFrame(model.cluster_centers_[np.argsort(-sizes, kind="stable")], columns=profile.columns)
+
+    names = pd.Series([name(c) for _, c in centers.iterrows()])
+    dup = names.duplicated(keep=False)
+    names[dup] = names[dup] + " " + (names[dup].groupby(names[dup]).cumcount() + 1).astype(str)
+    centers.index = pd.Index(names, name="archetype")
+
+    assigned = pd.DataFrame({
+        "cluster": labels,
+        "archetype": names.to_numpy()[labels],
+        "color": np.array(COLORS * (k // len(COLORS) + 1))[labels],
+    }, index=profile.index)
+    return assigned, centers
@@ -0,0 +1,174 @@
+# rebalancing.py
+"""Van routes that move bikes from full stations to empty ones.
+
+Each station has a surplus (bikes above its target fill) or a deficit. Vans
+start at a depot, pick bikes up at stations with surplus and drop them off at
+stations with deficit without ever exceeding their own capacity. The solver is
+a greedy construction (each step the least-used van goes to the stop with the
+best bikes-moved / distance score) followed by a 2-opt local search on every
+route. Distances come from a precomputed station × station matrix, so a plan
+for ~500 stations and a few vans takes well under a second.
+"""
+
+import numpy as np
+import pandas as pd
+
+import anomalies
+import stations
+
+DEPOT = stations.CITY_CENTER
+
+# Fixed cost (metres) added to every stop, so vans don't zig-zag for 1 bike
+STOP_COST_M = 300
+
+
+def distance_matrix(lat, lon) -> np.ndarray:
+    """Pairwise ``stations.distance_m`` as a float32 matrix."""
+    lat = np.asarray(lat, dtype="float64")
+    lon = np.asarray(lon, dtype="float64")
+    return stations.distance_m(lat[:, None], lon[:, None], lat[None, :], lon[None, :]).astype("float32")
+
+
+def station_state(facts: pd.DataFrame, master: pd.DataFrame, hour: int | None = None) -> pd.DataFrame:
+    """Bikes and capacity per station, row-aligned with ``master``.
+
+    ``hour=None`` takes each station's latest reading; otherwise the typical
+    (mean) availability at that hour of day, as a simple forecast. Stations
+    without readings keep ``NA`` bikes and are never visited; see
+    ``stations.capacity`` for unknown capacities. Readings
+    flagged by ``anomalies.detect`` are ignored.
+    """
+    facts = anomalies.clean(facts)
+    if hour is None:
+        last = facts.loc[facts.groupby("station_id")["time"].idxmax()]
+        bikes = last.set_index("station_id")["available_bikes"]
+    else:
+        bikes = facts.loc[facts["hour"] == hour].groupby("station_id")["available_bikes"].mean()
+
+    state = master[["latitude", "longitude", "capacity"]].copy()
+    state["bikes"] = bikes.reindex(state.index).round()
+    state["capacity"] = stations.capacity(master, facts).reindex(state.index)
+    return state
+
+
+def imbalance(state: pd.DataFrame, target: float = 0.5, min_bikes: int = 2) -> pd.Series:
+    """Bikes to remove (>0) or add (<0) per station to reach ``target`` fill.
+
+    Stations closer than ``min_bikes`` to their target are left alone.
+    """
+    diff = (state["bikes"] - target * state["capacity"]).fillna(0).round().astype("int64")
+    return diff.where(diff.abs() >= min_bikes, 0)
+
+
+# ─── SOLVER ─────────────────────────────────────────────────
+def _loads(route):
+    return np.cumsum([q for _, q in route]) if route else np.array([])
+
+
+def _drop_undelivered(route, supply):
+    """Trim pickups whose bikes are still in the van when the route ends."""
+    route = [list(s) for s in route]
+    excess = int(_loads(route)[-1]) if route else 0
+    for k in range(len(route) - 1, -1, -1):
+        if excess == 0:
+            break
+        stop, qty = route[k]
+        if qty > 0:
+            room = int(_loads(route)[k:].min())
+            r = min(qty, excess, room)
+            route[k][1] -= r
+            supply[stop] += r
+            excess -= r
+    return [(s, q) for s, q in route if q != 0]
+
+
+def _two_opt(route, d, van_capacity):
+    """Reverse segments of the route while that shortens it and loads stay valid."""
+    if len(route) < 3:
+        return route
+    improved = True
+    while improved:
+        improved = False
+        nodes = np.array([len(d) - 1] + [s for s, _ in route])
+        n = len(nodes)
+        # gain of reversing nodes[i..j]; the path is open, so j may be the last node
+        i = np.arange(1, n)[:, None]
+        j = np.arange(1, n)[None, :]
+        prev, first, last = nodes[i - 1], nodes[i], nodes[j]
+        nxt = np.where(j + 1 < n, nodes[np.minimum(j + 1, n - 1)], -1)
+        old = d[prev, first] + np.where(nxt >= 0, d[last, nxt], 0)
+        new = d[prev, last] + np.where(nxt >= 0, d[first, nxt], 0)
+        delta = np.where(j > i, new - old, 0)
+        for flat in np.argsort(delta, axis=None):
+            ii, jj = np.unravel_index(flat, delta.shape)
+            if delta[ii, jj] >= -1:
+                break
+            cand = route[:ii] + route[ii:jj + 1][::-1] + route[jj + 1:]
+            loads = _loads(cand)
+            if loads.min() >= 0 and loads.max() <= van_capacity:
+                route, improved = cand, True
+                break
+    return route
+
+
+def plan(state: pd.DataFrame, dist: np.ndarray, n_vehicles: int = 3, van_capacity: int = 20,
+         target: float = 0.5, max_km: float = 30.0, depot: tuple = DEPOT) -> pd.DataFrame:
+    """Pick-up/drop-off routes for ``n_vehicles`` vans.
+
+    ``state`` comes from ``station_state`` and ``dist`` is the
+    ``distance_matrix`` of the same stations in the same order. Returns one
+    row per stop: vehicle, seq, station_id, bikes (+ pick up, − drop off),
+    load after the stop and cumulative km.
+    """
+    imb = imbalance(state, target).to_numpy()
+    active = np.flatnonzero(imb)
+    supply = np.clip(imb[active], 0, None)
+    demand = np.clip(-imb[active], 0, None)
+
+    # Sub-matrix of the active stations, with the depot as the last node
+    m = len(active)
+    d = np.zeros((m + 1, m + 1), dtype="float64")
+    d[:m, :m] = dist[np.ix_(active, active)]
+    lat = state["latitude"].to_numpy(dtype="float64")[active]
+    lon = state["longitude"].to_numpy(dtype="float64")[active]
+    dep = np.r_[stations.distance_m(depot[0], depot[1], lat, lon), 0.0]
+    d[m, :], d[:, m] = dep, dep
+
+    routes = [[] for _ in range(n_vehicles)]
+    pos = np.full(n_vehicles, m)
+    load = np.zeros(n_vehicles, dtype="int64")
+    km = np.zeros(n_vehicles)
+    done = np.zeros(n_vehicles, dtype=bool)
+    max_m = max_km * 1000
+
+    while not done.all():
+        v = int(np.argmin(np.where(done, np.inf, km)))
+        dv = d[pos[v], :m]
+        pick = np.minimum(supply, van_capacity - load[v])
+        drop = np.minimum(demand, load[v])
+        gain = np.maximum(pick, drop)
+        reachable = (gain > 0) & (km[v] + dv <= max_m)
+        if not reachable.any():
+            done[v] = True
+            continue
+        score = np.where(reachable, gain / (dv + STOP_COST_M), -1)
+        j = int(np.argmax(score))
+        if drop[j] >= pick[j]:
+            qty = -int(drop[j])
+            demand[j] += qty
+        else:
+            qty = int(pick[j])
+            supply[j] -= qty
+        routes[v].append((j, qty))
+        load[v] += qty
+        km[v] += dv[j]
+        pos[v] = j
+
+    rows = []
+    for v, route in enumerate(routes):
+        route = _two_opt(_drop_undelivered(route, supply), d, van_capacity)
+        nodes = [m] + [s for s, _ in route]
+        legs = np.cumsum([d[a, b] for a, b in zip(nodes, nodes[1:])]) / 1000
+        for seq, ((s, q), l, k) in enumerate(zip(route, _loads(route), legs), start=1):
+            rows.append((v + 1, seq, state.index[active[s]], q, int(l), round(float(k), 2)))
+    return pd.DataFrame(rows, columns=["vehicle", "seq", "station_id", "bikes", "load", "km"])
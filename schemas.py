@@ -0,0 +1,209 @@
+# schemas.py
+"""Declared layout of every CSV the app reads.
+
+Each input has a ``Schema``: the columns to read and their dtypes, datetime
+formats and the columns a row can't do without. ``read`` parses only those
+columns with the declared types, with pyarrow's multithreaded CSV reader when
+it is installed (``"ISO8601"`` dates use its native parser) and pandas
+otherwise, so nothing is inferred. Rows missing a required column are
+dropped; other values that don't parse or don't fit their dtype (an integer
+column never wraps or truncates) become NA. Both are listed in a separate
+table, one row per problem:
+
+    df, rejected = schemas.read("markers")
+
+If a typed pyarrow read fails on a bad value, the file is re-read leniently
+with pandas to find the offending rows instead of failing the whole load.
+"""
+
+import io
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+except ImportError:  # pandas' C parser instead
+    pa = None
+
+REJECTED_COLUMNS = ["row", "column", "value", "reason"]
+
+# Base of timestamps packed into 4 bytes (``uint32`` seconds reach 2136)
+EPOCH = np.datetime64("2000-01-01T00:00:00", "s")
+
+
+@dataclass(frozen=True)
+class Schema:
+    """Columns (name → dtype) of one CSV, datetime formats and required columns."""
+    columns: dict
+    path: str | None = None
+    # column → strftime format or "ISO8601"; an integer dtype stores seconds since EPOCH
+    dates: dict = field(default_factory=dict)
+    required: tuple = ()
+    encoding: str = "utf-8"
+
+
+SCHEMAS = {
+    # Release dataset (URL or local stand-in, see datasets.RELEASE_ENV), in the
+    # compact layout it is kept in memory: ~500 station ids fit in int16
+    "release": Schema(
+        columns={
+            "station_id": "int16", "name": "category", "latitude": "float32",
+            "longitude": "float32", "time": "uint32", "available_bikes": "int16",
+            "cross_street": "category",
+        },
+        dates={"time": "ISO8601"},  # kept as seconds since EPOCH
+        required=("station_id", "time", "available_bikes"),
+    ),
+    # Official station list
+    "stations": Schema(
+        columns={
+            "station_id": "int32", "name": "string", "lat": "float64", "lon": "float64",
+            "altitude": "float32", "address": "string", "cross_street": "string",
+            "post_code": "string", "capacity": "Int16",
+        },
+        path="data/Informacio_Estacions_Bicing_2025.csv",
+        required=("station_id",),
+    ),
+    # Current stations and proposals (keyed by name only)
+    "markers": Schema(
+        columns={
+            "name": "string", "latitude": "float64", "longitude": "float64",
+            "description": "string", "type": "string",
+        },
+        path="data/markers_combinado.csv",
+        required=("latitude", "longitude"),
+    ),
+    # Hourly availability sample (App v9 animated map)
+    "availability": Schema(
+        columns={
+            "name": "string", "latitude": "float64", "longitude": "float64",
+            "time": "datetime64[s]", "available_bikes": "int16",
+        },
+        path="data/availability.csv",
+        dates={"time": "%Y-%m-%d %H:%M:%S"},
+        required=("latitude", "longitude", "time", "available_bikes"),
+        encoding="utf-8-sig",
+    ),
+}
+
+
+def _arrow_type(dtype: str):
+    if dtype == "category":
+        return pa.dictionary(pa.int32(), pa.string())
+    if dtype.startswith("datetime64"):
+        return pa.timestamp(dtype[len("datetime64["):-1])
+    if dtype == "string":
+        return pa.string()
+    return pa.from_numpy_dtype(np.dtype(dtype.lower()))
+
+
+def _read_arrow(source, schema: Schema) -> pd.DataFrame:
+    formats = [f for f in schema.dates.values() if f != "ISO8601"]
+    types = {c: _arrow_type(t) for c, t in schema.columns.items()}
+    types.update({c: pa.timestamp("s") for c in schema.dates if _is_integer(schema.columns[c])})
+    convert = pa_csv.ConvertOptions(
+        include_columns=list(schema.columns),
+        column_types=types,
+        timestamp_parsers=[pa_csv.ISO8601, *formats],
+        strings_can_be_null=True,
+    )
+    table = pa_csv.read_csv(
+        source,
+        read_options=pa_csv.ReadOptions(encoding=schema.encoding, use_threads=True),
+        convert_options=convert,
+    )
+    return table.to_pandas()
+
+
+def _read_lenient(source, schema: Schema) -> tuple[pd.DataFrame, list]:
+    """Every declared column as text, then converted one by one; unparseable values become NA."""
+    raw = pd.read_csv(source, usecols=list(schema.columns), dtype=str, encoding=schema.encoding)
+    df, problems = pd.DataFrame(index=raw.index), []
+    for col, dtype in schema.columns.items():
+        text = raw[col].str.strip()
+        if col in schema.dates:
+            fmt = schema.dates[col]
+            value = pd.to_datetime(text, format=fmt, errors="coerce")
+        elif dtype in ("string", "category"):
+            value = raw[col]
+        else:
+            value = pd.to_numeric(text, errors="coerce")
+        bad = text.notna() & (text != "") & value.isna()
+        problems += [(i, col, v, "unparseable") for i, v in raw.loc[bad, col].items()]
+        if _is_integer(dtype) and col not in schema.dates:
+            # astype would wrap or truncate these without a word
+            info = np.iinfo(np.dtype(dtype.lower()))
+            invalid = value.notna() & ((value % 1 != 0) | (value < info.min) | (value > info.max))
+            problems += [(i, col, v, f"not a valid {dtype}") for i, v in raw.loc[invalid, col].items()]
+            value = value.mask(invalid)
+        df[col] = value
+    return df, problems
+
+
+def _is_integer(dtype: str) -> bool:
+    return dtype.lower().startswith(("int", "uint"))
+
+
+def _pack_times(df: pd.DataFrame, schema: Schema) -> list:
+    """Timestamps declared with an integer dtype → seconds since ``EPOCH``; out of range → NA."""
+    problems = []
+    for col in schema.dates:
+        dtype = schema.columns[col]
+        if not _is_integer(dtype):
+            continue
+        secs = (df[col] - pd.Timestamp(EPOCH)) // pd.Timedelta(seconds=1)
+        info = np.iinfo(np.dtype(dtype.lower()))
+        invalid = secs.notna() & ((secs < info.min) | (secs > info.max))
+        problems += [(i, col, str(v), f"not a valid {dtype}") for i, v in df.loc[invalid, col].items()]
+        df[col] = secs.mask(invalid)
+    return problems
+
+
+def timestamps(times):
+    """``datetime64[s]`` of times packed by ``read`` (Series stay Series; datetimes pass through)."""
+    if isinstance(times, pd.Series):
+        return pd.Series(timestamps(times.to_numpy()), index=times.index, name=times.name)
+    a = np.asarray(times)
+    if np.issubdtype(a.dtype, np.datetime64):
+        return a.astype("datetime64[s]")
+    return EPOCH + a.astype("int64").astype("timedelta64[s]")
+
+
+def read(name: str, source=None) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """Parse ``source`` (path, URL bytes or buffer; default the schema's path) as schema ``name``.
+
+    Returns the kept rows with the declared dtypes (index reset) and the
+    problems found: row (0-based data row), column, value, reason
+    (``"missing"`` drops the row; ``"unparseable"`` and ``"not a valid <dtype>"``,
+    e.g. a fraction or an overflow in an integer column, only the value
+    unless the column is required).
+    """
+    schema = SCHEMAS[name]
+    source = schema.path if source is None else source
+    if isinstance(source, bytes):
+        source = io.BytesIO(source)
+
+    problems = []
+    df = None
+    if pa is not None:
+        try:
+            df = _read_arrow(source, schema)
+        except pa.ArrowInvalid:
+            if hasattr(source, "seek"):
+                source.seek(0)
+    if df is None:
+        df, problems = _read_lenient(source, schema)
+    problems += _pack_times(df, schema)
+
+    missing = df[list(schema.required)].isna()
+    for col in schema.required:
+        problems += [(i, col, None, "missing") for i in df.index[missing[col].to_numpy()]]
+    bad = missing.any(axis=1).to_numpy()
+
+    df = df.loc[~bad].reset_index(drop=True)
+    df = df.astype({c: t for c, t in schema.columns.items() if str(df[c].dtype) != t})
+    rejected = pd.DataFrame(problems, columns=REJECTED_COLUMNS)
+    return df, rejected.drop_duplicates(["row", "column"]).sort_values("row", ignore_index=True)
@@ -0,0 +1,255 @@
+# stations.py
+"""Station master table, one row per ``station_id``.
+
+Station metadata comes from three places: the official station list
+(``Informacio_Estacions_Bicing_2025.csv``: capacity, altitude, post code,
+cross street), the release dataset (where name and cross street repeat on every
+row) and ``markers_combinado.csv``, which is keyed only by name. ``build``
+reconciles them into a single table indexed by ``station_id``; name-only
+sources are matched by exact, then normalized name (the nearest station when
+several share it), falling back to the nearest station with a similar name.
+``load`` caches the result on disk, so fact tables only need to carry
+``station_id`` and join through ``lookup``.
+
+The city-scale geometry (``CITY_CENTER``, ``project``, ``distance_m``) is
+shared by the map layers and the rebalancing planner.
+"""
+
+import difflib
+import glob
+import hashlib
+import os
+import re
+import tempfile
+import unicodedata
+
+import numpy as np
+import pandas as pd
+
+import schemas
+
+INFO_PATH = schemas.SCHEMAS["stations"].path
+MARKERS_PATH = schemas.SCHEMAS["markers"].path
+CACHE_DIR = "data/cache"
+CACHE_VERSION = 2  # bump when ``build`` changes what it returns
+
+# Per-station columns that fact tables no longer need to carry
+FACT_COLUMNS = ["name", "cross_street", "latitude", "longitude"]
+# Marker rows have no id: they are told apart by name and position
+MARKER_KEY = ["name", "latitude", "longitude"]
+
+CITY_CENTER = (41.3851, 2.1734)  # Plaça de Catalunya
+EARTH_M = 6_371_000
+
+MATCH_RADIUS_M = 75
+MATCH_CUTOFF = 0.6
+
+
+# ─── GEOMETRY ───────────────────────────────────────────────
+def project(lat, lon, origin=CITY_CENTER):
+    """Metres east/north of ``origin`` (equirectangular, like ``distance_m``)."""
+    k = np.pi / 180
+    x = (np.asarray(lon, dtype="float64") - origin[1]) * k * np.cos(origin[0] * k) * EARTH_M
+    y = (np.asarray(lat, dtype="float64") - origin[0]) * k * EARTH_M
+    return x, y
+
+
+def unproject(x, y, origin=CITY_CENTER):
+    """Inverse of ``project``: (lat, lon) of points ``x``/``y`` metres from ``origin``."""
+    k = np.pi / 180
+    lat = origin[0] + y / EARTH_M / k
+    lon = origin[1] + x / (EARTH_M * np.cos(origin[0] * k)) / k
+    return lat, lon
+
+
+def distance_m(lat1, lon1, lat2, lon2):
+    """Equirectangular distance in metres (broadcasts); accurate at city scale."""
+    k = np.pi / 180
+    x = (lon2 - lon1) * k * np.cos((lat1 + lat2) * k / 2)
+    y = (lat2 - lat1) * k
+    return EARTH_M * np.hypot(x, y)
+
+
+# ─── NAME MATCHING ──────────────────────────────────────────
+def normalize_name(name) -> str:
+    """Uppercase ASCII letters and digits only, e.g. ``"C/ NÀPOLS, 82"`` → ``"CNAPOLS82"``.
+
+    UTF-8 text that was decoded as latin1 is repaired first.
+    """
+    s = str(name)
+    try:
+        s = s.encode("latin1").decode("utf-8")
+    except UnicodeError:
+        pass
+    s = unicodedata.normalize("NFKD", s).encode("ascii", "ignore").decode()
+    return re.sub(r"[^A-Z0-9]", "", s.upper())
+
+
+def _nearest(candidates: list, lat: float, lon: float, ref_lat, ref_lon) -> int:
+    """Position of the candidate closest to (lat, lon); the first one if none is located."""
+    if len(candidates) == 1:
+        return candidates[0]
+    dist = distance_m(lat, lon, ref_lat[candidates], ref_lon[candidates])
+    return candidates[int(np.argmin(np.where(np.isnan(dist), np.inf, dist)))]
+
+
+def match_names(names, lats, lons, ref: pd.DataFrame) -> pd.Series:
+    """``station_id`` in ``ref`` for each (name, lat, lon), ``<NA>`` if unmatched.
+
+    The exact name wins, then the normalized name; when several stations share
+    it (e.g. ``"PG. DE COLOM /VIA LAIETANA"`` and ``"PG. DE COLOM (VIA
+    LAIETANA)"``) the nearest one is taken. Otherwise the nearest station
+    within ``MATCH_RADIUS_M`` is taken if its name is similar enough.
+    """
+    names = [str(n).strip() for n in names]
+    keys = [normalize_name(n) for n in names]
+    lats = np.asarray(lats, dtype=float)
+    lons = np.asarray(lons, dtype=float)
+    ref_lat = ref["latitude"].to_numpy(dtype="float64", na_value=np.nan)
+    ref_lon = ref["longitude"].to_numpy(dtype="float64", na_value=np.nan)
+    ref_norm = ref["name"].map(normalize_name).to_numpy()
+
+    by_name, by_key = {}, {}
+    for j, (n, k) in enumerate(zip(ref["name"], ref_norm)):
+        by_name.setdefault(str(n).strip(), []).append(j)
+        by_key.setdefault(k, []).append(j)
+
+    ids = pd.Series(pd.NA, index=range(len(names)), dtype="Int64")
+    for i, (n, k) in enumerate(zip(names, keys)):
+        candidates = by_name.get(n) or by_key.get(k)
+        if candidates:
+            ids.iloc[i] = ref.index[_nearest(candidates, lats[i], lons[i], ref_lat, ref_lon)]
+
+    todo = np.flatnonzero(ids.isna().to_numpy())
+    if len(todo):
+        dist = distance_m(lats[todo, None], lons[todo, None], ref_lat[None, :], ref_lon[None, :])
+        dist = np.where(np.isnan(dist), np.inf, dist)
+        nearest = dist.argmin(axis=1)
+        for k, (i, j) in enumerate(zip(todo, nearest)):
+            close = dist[k, j] <= MATCH_RADIUS_M
+            if close and difflib.SequenceMatcher(None, keys[i], ref_norm[j]).ratio() >= MATCH_CUTOFF:
+                ids.iloc[i] = ref.index[j]
+    return ids
+
+
+# ─── MASTER TABLE ───────────────────────────────────────────
+def read_info(path: str = INFO_PATH) -> pd.DataFrame:
+    """Official station list, indexed by ``station_id``."""
+    info, _ = schemas.read("stations", path)
+    info = info.rename(columns={"lat": "latitude", "lon": "longitude"})
+    cols = ["station_id", "name", "address", "cross_street", "post_code",
+            "latitude", "longitude", "altitude", "capacity"]
+    return info[cols].drop_duplicates("station_id").set_index("station_id").sort_index()
+
+
+def _markers(path: str) -> pd.DataFrame:
+    df, _ = schemas.read("markers", path)
+    return df
+
+
+def build(facts: pd.DataFrame | None = None, info_path: str = INFO_PATH,
+          markers_path: str = MARKERS_PATH) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """Reconcile every station source into one table indexed by ``station_id``.
+
+    Also returns the marker matches (name, latitude, longitude → station_id,
+    one row per marker) so the markers are joined by id, never re-matched.
+    """
+    master = read_info(info_path)
+
+    # Stations that only appear in the release dataset
+    if facts is not None:
+        cols = ["station_id"] + [c for c in FACT_COLUMNS if c in facts.columns]
+        seen = facts[cols].drop_duplicates("station_id").set_index("station_id")
+        extra = seen.loc[~seen.index.isin(master.index)]
+        master = pd.concat([master, extra]).sort_index()
+        # The release names win for stations that were renamed
+        if "name" in seen:
+            master.update(seen[["name"]])
+
+    # Name-only source: attach the marker type/description to its station
+    mk = _markers(markers_path)
+    mk["station_id"] = match_names(mk["name"], mk["latitude"], mk["longitude"], master)
+    marker_ids = mk[MARKER_KEY + ["station_id"]].drop_duplicates(MARKER_KEY, ignore_index=True)
+    mk = mk.dropna(subset=["station_id"]).drop_duplicates("station_id").set_index("station_id")
+    master = master.join(mk[["description", "type"]].rename(columns={"type": "marker_type"}))
+
+    master["neighborhood"] = master["cross_street"].str.split("/", n=1).str[0]
+    for col in ("name", "address", "cross_street", "neighborhood", "marker_type"):
+        master[col] = master[col].astype("category")
+    master["latitude"] = master["latitude"].astype("float32")
+    master["longitude"] = master["longitude"].astype("float32")
+    master["capacity"] = master["capacity"].astype("Int16")
+    master.index = master.index.astype("int32")
+    master.index.name = "station_id"
+    return master, marker_ids
+
+
+def _cache_key(facts, paths) -> str:
+    h = hashlib.sha1(f"v{CACHE_VERSION}".encode())
+    # How the sources are parsed is part of the key, not only their contents
+    h.update(repr([schemas.SCHEMAS["stations"], schemas.SCHEMAS["markers"]]).encode())
+    for p in paths:
+        st = os.stat(p)
+        h.update(f"{p}:{st.st_size}:{st.st_mtime_ns}".encode())
+    if facts is not None:
+        cols = [c for c in ["station_id"] + FACT_COLUMNS if c in facts.columns]
+        seen = facts[cols].drop_duplicates("station_id")
+        h.update(pd.util.hash_pandas_object(seen, index=False).to_numpy().tobytes())
+    return h.hexdigest()[:16]
+
+
+def load(facts: pd.DataFrame | None = None, info_path: str = INFO_PATH,
+         markers_path: str = MARKERS_PATH, cache_dir: str = CACHE_DIR) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """``build``, cached on disk by source files, their schemas and the stations seen in ``facts``.
+
+    The app and ``metrics_api.py`` may share ``cache_dir``: the pickle is
+    written to a temporary file and renamed into place, so no reader ever
+    sees half of it, and tables cached under older keys are removed.
+    """
+    name = f"stations-{_cache_key(facts, [info_path, markers_path])}.pkl"
+    path = os.path.join(cache_dir, name)
+    if os.path.exists(path):
+        return pd.read_pickle(path)
+    tables = build(facts, info_path, markers_path)
+    os.makedirs(cache_dir, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(prefix=".stations-", suffix=".tmp", dir=cache_dir)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            pd.to_pickle(tables, f)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+    for old in glob.glob(os.path.join(cache_dir, "stations-*.pkl")):
+        if os.path.basename(old) != name:
+            try:
+                os.remove(old)
+            except FileNotFoundError:  # pruned by another process
+                pass
+    return tables
+
+
+# ─── LOOKUPS ────────────────────────────────────────────────
+def capacity(master: pd.DataFrame, facts: pd.DataFrame) -> pd.Series:
+    """Docks per station (``Float64``, index station_id).
+
+    Stations without a known capacity use the largest reading seen in
+    ``facts``, so fill shares and thresholds stay defined for them.
+    """
+    seen_max = facts.groupby("station_id")["available_bikes"].max().astype("Float64")
+    cap = master["capacity"].astype("Float64").reindex(master.index.union(seen_max.index))
+    return cap.fillna(seen_max)
+
+
+def lookup(master: pd.DataFrame, ids, column: str) -> pd.Series:
+    """Values of ``column`` for each station id in ``ids`` (``NA`` if unknown).
+
+    Uses a binary search on the sorted integer index, so it stays vectorized
+    for millions of ids.
+    """
+    ids = pd.Series(ids).fillna(-1).to_numpy("int64")
+    index = master.index.to_numpy()
+    pos = np.clip(np.searchsorted(index, ids), 0, len(index) - 1)
+    found = index[pos] == ids
+    values = master[column].iloc[pos].reset_index(drop=True)
+    return values.where(found)